@@ -0,0 +1,35 @@
+"""Micro-benchmark of the JSON codec used by the HTTP, MQTT and ABRP paths.
+
+Compares the stdlib backend with the optional fast backend on a status payload
+and on the legacy double decode (text() then json()) of make_http_request.
+
+    python -m benchmarks.codec_bench
+"""
+import json
+import timeit
+
+from custom_components.stellantis_vehicles import codec
+
+from .payloads import vehicle_status
+
+NUMBER = 5000
+
+
+def run():
+    payload = vehicle_status("Hybrid", seed=1)
+    body = json.dumps(payload).encode("utf-8")
+    cases = {
+        "stdlib decode (text + json)": lambda: json.loads(body.decode("utf-8")) if body.decode("utf-8") else {},
+        "stdlib decode (bytes)": lambda: json.loads(body),
+        f"codec decode ({codec.JSON_BACKEND})": lambda: codec.decode_body(body, 200),
+        "stdlib encode": lambda: json.dumps(payload),
+        f"codec encode ({codec.JSON_BACKEND})": lambda: codec.json_dumps(payload)
+    }
+    print(f"Payload: {len(body)} bytes, {NUMBER} iterations")
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        print(f"{name:<32} {seconds / NUMBER * 1e6:8.2f} us/op")
+
+
+if __name__ == "__main__":
+    run()
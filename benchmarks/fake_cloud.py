@@ -0,0 +1,226 @@
+"""Local stand-in of the Stellantis cloud endpoints used by the integration.
+
+Serves synthetic vehicles with configurable count, latency, error rate and
+injection of the error answers the integration handles specially
+(404 40400, 500 50000, 400 invalid_grant). Point the integration to it with:
+
+    STELLANTIS_OAUTH_URL=http://127.0.0.1:8080
+    STELLANTIS_API_URL=http://127.0.0.1:8080
+    STELLANTIS_ABRP_URL=http://127.0.0.1:8080
+
+    python -m benchmarks.fake_cloud --vehicles 50 --latency 0.2 --error-rate 0.01
+
+Settings can be changed at runtime with POST /_control (same keys as FakeCloudSettings)
+and request counters are read with GET /_stats.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import random
+import time
+from datetime import datetime, timezone
+from dataclasses import dataclass, field, asdict
+from uuid import uuid4
+
+from aiohttp import web
+
+from .payloads import vehicles_list, vehicle_status, vehicle_trips, vin_for, VEHICLE_TYPES
+
+TRIPS_PAGE_SIZE = 60
+
+
+@dataclass
+class FakeCloudSettings:
+    vehicles: int = 3
+    latency: float = 0.0                # seconds added to every answer
+    jitter: float = 0.0                 # random extra latency, seconds
+    error_rate: float = 0.0             # share of 500 answers (transient)
+    not_found_rate: float = 0.0         # share of 404 40400 on status
+    module_replaced_rate: float = 0.0   # share of 500 50000 on status
+    invalid_grant_rate: float = 0.0     # share of 400 invalid_grant on token
+    upload_interval: float = 120.0      # seconds between two telemetry uploads of a vehicle
+    trips: int = 5                      # trips per vehicle
+    moving: list = field(default_factory=list)    # vins reported as moving
+    charging: list = field(default_factory=list)  # vins reported as charging
+
+
+class FakeStellantisCloud:
+    def __init__(self, settings=None, seed=0):
+        self.settings = settings or FakeCloudSettings()
+        self.base_url = "http://127.0.0.1:8080"
+        self._random = random.Random(seed)
+        self.stats = {}
+
+    # Helpers
+
+    def count(self, name):
+        self.stats[name] = self.stats.get(name, 0) + 1
+
+    def vehicle_index(self, vehicle_id):
+        return int(vehicle_id.split("-")[1])
+
+    async def delay(self):
+        delay = self.settings.latency + self._random.uniform(0, self.settings.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def roll(self, rate):
+        return rate > 0 and self._random.random() < rate
+
+    def json_response(self, request, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200 and request.headers.get("If-None-Match") == etag:
+            self.count("not_modified")
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, status=status, content_type="application/json", headers={"ETag": etag})
+
+    def transient_error(self, request):
+        if self.roll(self.settings.error_rate):
+            self.count("error_500")
+            return self.json_response(request, {"httpMessage": "Internal Server Error", "moreInformation": "Injected error"}, 500)
+        return None
+
+    def token(self):
+        return {
+            "access_token": uuid4().hex,
+            "refresh_token": uuid4().hex,
+            "id_token": uuid4().hex,
+            "token_type": "Bearer",
+            "expires_in": 3600
+        }
+
+    # Endpoints
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        resource = request.match_info.route.resource
+        self.count(f"{request.method} {resource.canonical if resource else request.path}")
+        if not request.path.startswith("/_"):
+            await self.delay()
+        return await handler(request)
+
+    async def oauth_token(self, request):
+        if error := self.transient_error(request):
+            return error
+        if self.roll(self.settings.invalid_grant_rate):
+            self.count("invalid_grant")
+            return self.json_response(request, {"error": "invalid_grant", "error_description": "Injected invalid grant"}, 400)
+        return self.json_response(request, self.token())
+
+    async def mqtt_token(self, request):
+        if error := self.transient_error(request):
+            return error
+        return self.json_response(request, self.token())
+
+    async def user_info(self, request):
+        return self.json_response(request, [{"customer": "AP-FAKECUSTOMER", "vehicle": vin_for(0), "car_association_id": uuid4().hex}])
+
+    async def otp_sms(self, request):
+        return self.json_response(request, {})
+
+    async def vehicles(self, request):
+        if error := self.transient_error(request):
+            return error
+        return self.json_response(request, vehicles_list(self.settings.vehicles, self.base_url))
+
+    async def status(self, request):
+        if error := self.transient_error(request):
+            return error
+        if self.roll(self.settings.not_found_rate):
+            self.count("not_found_40400")
+            return self.json_response(request, {"message": "We didn't find the status for this vehicle.", "code": 40400}, 404)
+        if self.roll(self.settings.module_replaced_rate):
+            self.count("module_replaced_50000")
+            return self.json_response(request, {"message": "Connection module replaced", "code": "50000"}, 500)
+        index = self.vehicle_index(request.match_info["vehicle_id"])
+        vin = vin_for(index)
+        # The content only changes at each telemetry upload of the vehicle
+        now = time.time()
+        upload = int(now // self.settings.upload_interval)
+        updated_at = upload * self.settings.upload_interval
+        status = vehicle_status(
+            VEHICLE_TYPES[index % len(VEHICLE_TYPES)],
+            moving=vin in self.settings.moving,
+            charging=vin in self.settings.charging,
+            updated_at=datetime.fromtimestamp(updated_at, timezone.utc),
+            seed=f"{index}-{upload}"
+        )
+        return self.json_response(request, status)
+
+    async def trips(self, request):
+        if error := self.transient_error(request):
+            return error
+        page = int(request.query.get("pageToken", "0") or 0)
+        data = vehicle_trips(self.settings.trips, TRIPS_PAGE_SIZE, page)
+        last_page = max(0, (self.settings.trips - 1) // TRIPS_PAGE_SIZE)
+        url = f"{self.base_url}{request.path}"
+        data["_links"] = {"last": {"href": f"{url}?pageToken={last_page}"}}
+        if page < last_page:
+            data["_links"]["next"] = {"href": f"{url}?pageToken={page + 1}"}
+        return self.json_response(request, data)
+
+    async def abrp(self, request):
+        return self.json_response(request, {"status": "ok"})
+
+    async def picture(self, request):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 450), (30, 90, 160)).save(buffer, "PNG")
+        return web.Response(body=buffer.getvalue(), content_type="image/png")
+
+    async def control(self, request):
+        for key, value in (await request.json()).items():
+            if hasattr(self.settings, key):
+                setattr(self.settings, key, value)
+        return web.json_response(asdict(self.settings))
+
+    async def get_stats(self, request):
+        return web.json_response({"settings": asdict(self.settings), "requests": self.stats})
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_post("/am/oauth2/access_token", self.oauth_token)
+        app.router.add_get("/applications/cvs/v4/mauv/car-associations", self.user_info)
+        app.router.add_post("/applications/cvs/v4/mobile/smsCode", self.otp_sms)
+        app.router.add_post("/connectedcar/v4/virtualkey/remoteaccess/token", self.mqtt_token)
+        app.router.add_get("/connectedcar/v4/user/vehicles", self.vehicles)
+        app.router.add_get("/connectedcar/v4/user/vehicles/{vehicle_id}/status", self.status)
+        app.router.add_get("/connectedcar/v4/user/vehicles/{vehicle_id}/trips", self.trips)
+        app.router.add_post("/1/tlm/send", self.abrp)
+        app.router.add_get("/pictures/{vin}.png", self.picture)
+        app.router.add_post("/_control", self.control)
+        app.router.add_get("/_stats", self.get_stats)
+        return app
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """ Start in the running loop, returns the runner to clean up. """
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    for name, default in asdict(FakeCloudSettings()).items():
+        if isinstance(default, list):
+            parser.add_argument(f"--{name.replace('_', '-')}", nargs="*", default=default)
+        else:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    cloud = FakeStellantisCloud(FakeCloudSettings(**args))
+    cloud.base_url = f"http://{host}:{port}"
+    web.run_app(cloud.make_app(), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
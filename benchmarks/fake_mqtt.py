@@ -0,0 +1,341 @@
+"""Local stand-in MQTT broker with a vehicle simulator for remote commands.
+
+Minimal MQTT 3.1.1 broker (QoS 0, plain TCP, '+'/'#' wildcards) answering the
+remote command topics like the vehicles do. Every service can be given a delay
+and a return code, events are published on the event topic of the vehicle
+after each command. Point the integration to it with:
+
+    STELLANTIS_MQTT_SERVER=127.0.0.1
+    STELLANTIS_MQTT_PORT=1883
+    STELLANTIS_MQTT_TLS=0
+
+    python -m benchmarks.fake_mqtt --delay 2 --code /Doors=0 --code /Horn=901
+
+Round-trip latency of the commands can be measured against a running broker
+(or an embedded one when --host is omitted) with:
+
+    python -m benchmarks.fake_mqtt --probe 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import struct
+import time
+from uuid import uuid4
+
+from custom_components.stellantis_vehicles.const import (
+    MQTT_RESP_TOPIC,
+    MQTT_EVENT_TOPIC,
+    MQTT_REQ_TOPIC
+)
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+SERVICES = ["/Doors", "/Horn", "/Lights", "/VehCharge", "/VehCharge/state", "/ThermalPrecond"]
+RETURN_CODES = ["0", "400", "901", "113", "300", "500"]
+
+
+# Packets
+
+def encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value):
+    value = value.encode("utf-8") if isinstance(value, str) else value
+    return struct.pack("!H", len(value)) + value
+
+
+def packet(packet_type, payload=b"", flags=0):
+    return bytes([packet_type << 4 | flags]) + encode_length(len(payload)) + payload
+
+
+def publish_packet(topic, payload):
+    return packet(PUBLISH, encode_string(topic) + payload)
+
+
+async def read_packet(reader):
+    header = (await reader.readexactly(1))[0]
+    length, multiplier = 0, 1
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        multiplier *= 128
+        if not byte & 0x80:
+            break
+    return header >> 4, header & 0x0F, await reader.readexactly(length)
+
+
+def read_string(data, offset):
+    length = struct.unpack_from("!H", data, offset)[0]
+    return data[offset + 2:offset + 2 + length].decode("utf-8"), offset + 2 + length
+
+
+def topic_matches(topic_filter, topic):
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(topic_levels) or (level != "+" and level != topic_levels[index]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+# Broker
+
+class FakeMqttBroker:
+    def __init__(self, delay=0.5, jitter=0.0, codes=None, delays=None, events=True, reject_auth=False, disconnect_after=0, seed=0):
+        self.delay = delay                          # default answer delay, seconds
+        self.jitter = jitter                        # random extra delay, seconds
+        self.codes = codes or {}                    # service -> return code (default "0")
+        self.delays = delays or {}                  # service -> answer delay
+        self.events = events                        # publish a vehicle event after each command
+        self.reject_auth = reject_auth              # answer CONNACK "not authorized"
+        self.disconnect_after = disconnect_after    # drop clients after N commands, to test reconnects
+        self._random = random.Random(seed)
+        self._clients = {}
+        self._server = None
+        self._commands = 0
+        self.port = None
+        self.stats = {"connections": 0, "rejected": 0, "commands": 0, "responses": 0, "events": 0, "dropped": 0}
+
+    async def start(self, host="127.0.0.1", port=1883):
+        self._server = await asyncio.start_server(self.handle_client, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        for writer in list(self._clients):
+            writer.close()
+        await asyncio.sleep(0.1)  # let the client handlers see the closed connections
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def handle_client(self, reader, writer):
+        self._clients[writer] = []
+        try:
+            while True:
+                packet_type, flags, data = await read_packet(reader)
+                if packet_type == CONNECT:
+                    self.stats["connections"] += 1
+                    if self.reject_auth:
+                        self.stats["rejected"] += 1
+                        writer.write(packet(CONNACK, b"\x00\x05"))
+                        await writer.drain()
+                        break
+                    writer.write(packet(CONNACK, b"\x00\x00"))
+                elif packet_type == SUBSCRIBE:
+                    packet_id = data[:2]
+                    offset, granted = 2, bytearray()
+                    while offset < len(data):
+                        topic_filter, offset = read_string(data, offset)
+                        offset += 1
+                        self._clients[writer].append(topic_filter)
+                        granted.append(0)
+                    writer.write(packet(SUBACK, packet_id + bytes(granted)))
+                elif packet_type == UNSUBSCRIBE:
+                    packet_id = data[:2]
+                    offset = 2
+                    while offset < len(data):
+                        topic_filter, offset = read_string(data, offset)
+                        if topic_filter in self._clients[writer]:
+                            self._clients[writer].remove(topic_filter)
+                    writer.write(packet(UNSUBACK, packet_id, 0))
+                elif packet_type == PUBLISH:
+                    topic, offset = read_string(data, 0)
+                    if flags & 0x06:  # QoS > 0, skip the packet id (no ack, the integration uses QoS 0)
+                        offset += 2
+                    self.route(topic, data[offset:])
+                elif packet_type == PINGREQ:
+                    writer.write(packet(PINGRESP))
+                elif packet_type == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    def publish(self, topic, payload):
+        data = publish_packet(topic, payload)
+        for writer, filters in list(self._clients.items()):
+            if any(topic_matches(topic_filter, topic) for topic_filter in filters):
+                writer.write(data)
+
+    def route(self, topic, payload):
+        self.publish(topic, payload)
+        if topic.startswith(MQTT_REQ_TOPIC):
+            self.stats["commands"] += 1
+            asyncio.get_running_loop().create_task(self.answer_command(topic, payload))
+
+    # Vehicle simulator
+
+    async def answer_command(self, topic, payload):
+        customer_service = topic[len(MQTT_REQ_TOPIC):]
+        customer_id, _, service = customer_service.partition("/")
+        service = "/" + service
+        request = json.loads(payload)
+        delay = float(self.delays.get(service, self.delay)) + self._random.uniform(0, self.jitter)
+        await asyncio.sleep(delay)
+        return_code = str(self.codes.get(service, "0"))
+        response = {
+            "vin": request["vin"],
+            "correlation_id": request["correlation_id"],
+            "return_code": return_code,
+            "req_date": request.get("req_date"),
+            "resp_date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        }
+        if return_code == "400":
+            response["reason"] = "[authorization.denied.cvs.response.invalid.token]"
+        self.publish(MQTT_RESP_TOPIC + customer_id + service, json.dumps(response).encode("utf-8"))
+        self.stats["responses"] += 1
+        if self.events and return_code == "0":
+            self.publish(MQTT_EVENT_TOPIC + request["vin"], json.dumps(self.vehicle_event(request, service)).encode("utf-8"))
+            self.stats["events"] += 1
+        self._commands += 1
+        if self.disconnect_after and self._commands % self.disconnect_after == 0:
+            for writer in list(self._clients):
+                self.stats["dropped"] += 1
+                writer.close()
+
+    def vehicle_event(self, request, service):
+        parameters = request.get("req_parameters") or {}
+        return {
+            "vin": request["vin"],
+            "correlation_id": request["correlation_id"],
+            "event_type": service.strip("/").replace("/", "_"),
+            "charging_state": {
+                "remaining_time": 0 if parameters.get("type") != "immediate" else 120,
+                "charge_mode": "slow"
+            },
+            "precond_state": {
+                "asap": parameters.get("asap", "deactivate"),
+                "programs": parameters.get("programs", {})
+            },
+            "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        }
+
+
+# Round-trip probe
+
+async def probe(host, port, count, customer_id="AP-FAKECUSTOMER", vin="VR3SIMULATED00000", service="/Horn"):
+    """ Send commands like the integration does and measure the time to their response. """
+    reader, writer = await asyncio.open_connection(host, port)
+    client_id = encode_string("probe-" + uuid4().hex[:8])
+    connect = encode_string("MQTT") + bytes([4, 0x02]) + struct.pack("!H", 60) + client_id
+    writer.write(packet(CONNECT, connect))
+    packet_type, _, data = await read_packet(reader)
+    if packet_type != CONNACK or data[1] != 0:
+        raise ConnectionError(f"Connection refused: {data[1]}")
+    writer.write(packet(SUBSCRIBE, b"\x00\x01" + encode_string(MQTT_RESP_TOPIC + customer_id + "/#") + b"\x00", 2))
+    await read_packet(reader)
+
+    latencies = []
+    codes = {}
+    for _ in range(count):
+        correlation_id = uuid4().hex
+        request = {"customer_id": customer_id, "correlation_id": correlation_id, "vin": vin, "req_parameters": {"action": "activate"}}
+        started = time.perf_counter()
+        writer.write(publish_packet(MQTT_REQ_TOPIC + customer_id + service, json.dumps(request).encode("utf-8")))
+        await writer.drain()
+        while True:
+            packet_type, _, data = await read_packet(reader)
+            if packet_type != PUBLISH:
+                continue
+            topic, offset = read_string(data, 0)
+            response = json.loads(data[offset:])
+            if topic.startswith(MQTT_RESP_TOPIC) and response.get("correlation_id") == correlation_id:
+                latencies.append(time.perf_counter() - started)
+                codes[response["return_code"]] = codes.get(response["return_code"], 0) + 1
+                break
+    writer.write(packet(DISCONNECT))
+    writer.close()
+    latencies.sort()
+    return {
+        "commands": count,
+        "return_codes": codes,
+        "min_ms": round(latencies[0] * 1000, 2),
+        "median_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2)
+    }
+
+
+def parse_service_values(values, choices=None):
+    result = {}
+    for value in values:
+        service, _, setting = value.partition("=")
+        if service not in SERVICES:
+            raise argparse.ArgumentTypeError(f"Unknown service {service}, expected one of {SERVICES}")
+        if choices and setting not in choices:
+            raise argparse.ArgumentTypeError(f"Unknown return code {setting}, expected one of {choices}")
+        result[service] = setting
+    return result
+
+
+async def run(args):
+    broker = None
+    host = args.host
+    if not args.probe or host is None:
+        broker = await FakeMqttBroker(
+            delay=args.delay,
+            jitter=args.jitter,
+            codes=parse_service_values(args.code, RETURN_CODES),
+            delays=parse_service_values(args.service_delay),
+            events=not args.no_events,
+            reject_auth=args.reject_auth,
+            disconnect_after=args.disconnect_after
+        ).start(args.bind, args.port)
+        host = args.bind
+        print(f"Fake MQTT broker listening on {args.bind}:{broker.port}")
+    try:
+        if args.probe:
+            print(json.dumps(await probe(host, broker.port if broker else args.port, args.probe), indent=2))
+        else:
+            await asyncio.Event().wait()
+    finally:
+        if broker:
+            print(json.dumps(broker.stats))
+            await broker.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--delay", type=float, default=0.5, help="answer delay of every service, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra answer delay, seconds")
+    parser.add_argument("--code", action="append", default=[], metavar="SERVICE=CODE", help=f"return code of a service, one of {RETURN_CODES}")
+    parser.add_argument("--service-delay", action="append", default=[], metavar="SERVICE=SECONDS", help="answer delay of a service")
+    parser.add_argument("--no-events", action="store_true", help="do not publish vehicle events")
+    parser.add_argument("--reject-auth", action="store_true", help="refuse every connection as not authorized")
+    parser.add_argument("--disconnect-after", type=int, default=0, help="drop all clients every N commands")
+    parser.add_argument("--probe", type=int, default=0, metavar="COUNT", help="send COUNT commands and report the round-trip latency")
+    parser.add_argument("--host", default=None, help="broker to probe, an embedded one is started when omitted")
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Fleet-scale load test: one account with 100+ vehicles.
+
+Starts the stand-in cloud (benchmarks/fake_cloud.py) in a separate process,
+then sets up the integration like async_setup_entry does: vehicles list,
+pictures in background, one coordinator per VIN, the entities of every
+platform wired to their coordinator, and the first refresh. Then it polls for a while, at a
+shortened interval, and reports:
+
+- setup time (vehicles, entities, first refresh) and background pictures time
+- memory per vehicle (tracemalloc during the setup)
+- steady-state CPU seconds per minute of this process (the cloud runs apart)
+- event loop lag (overshoot of a 100 ms sleep, p50 / p99 / max)
+- state writes per poll and HTTP requests per poll
+
+    python -m benchmarks.fleet_load --vehicles 100 --interval 10 --duration 120
+    python -m benchmarks.fleet_load --vehicles 100 200 400 --output fleet.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+CLOUD_PORT = 8089
+LAG_PROBE_INTERVAL = 0.1
+
+
+def flatten_translations(data, prefix="component.stellantis_vehicles"):
+    """ Translations as returned by translation.async_get_translations. """
+    result = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            result.update(flatten_translations(value, f"{prefix}.{key}"))
+        else:
+            result[f"{prefix}.{key}"] = value
+    return result
+
+
+async def probe_loop_lag(samples, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        samples.append(time.perf_counter() - started - LAG_PROBE_INTERVAL)
+
+
+def count_requests(stellantis):
+    """ Answered requests (any status, 304 included) seen by the trace hooks. """
+    return sum(sum(endpoint["status"].values()) for endpoint in stellantis._http_metrics.as_dict().values())
+
+
+def start_cloud(vehicles, port, interval):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_cloud", "--port", str(port), "--vehicles", str(vehicles), "--upload-interval", str(interval)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    time.sleep(1.5)
+    return process
+
+
+async def run_scenario(args):
+    # The integration reads the cloud URLs at import
+    from homeassistant.core import HomeAssistant
+    from custom_components.stellantis_vehicles import ( binary_sensor, button, device_tracker, number, sensor, switch, text )
+    from custom_components.stellantis_vehicles import time as time_platform
+    from custom_components.stellantis_vehicles.base import StellantisVehicleCoordinator
+    from custom_components.stellantis_vehicles.stellantis import StellantisVehicles
+    from custom_components.stellantis_vehicles.session import async_close_shared_session
+    from custom_components.stellantis_vehicles.const import ( DOMAIN, FIELD_MOBILE_APP, FIELD_COUNTRY_CODE, FIELD_REMOTE_COMMANDS )
+
+    platforms = [binary_sensor, button, device_tracker, number, sensor, switch, text, time_platform]
+    translations_path = os.path.join(os.path.dirname(sensor.__file__), "translations", "en.json")
+    with open(translations_path) as f:
+        translations = flatten_translations(json.load(f))
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.makedirs(os.path.join(config_dir, "www"))
+        hass = HomeAssistant(config_dir)
+        config = {
+            FIELD_MOBILE_APP: "MyPeugeot",
+            FIELD_COUNTRY_CODE: "FR",
+            FIELD_REMOTE_COMMANDS: False,
+            "customer_id": "AP-FAKECUSTOMER",
+            "oauth": {"access_token": "fake-access-token", "refresh_token": "fake-refresh-token", "expires_in": "2100-01-01T00:00:00+00:00"}
+        }
+        entry = type("Entry", (), {"entry_id": "fleet", "data": config})()
+        stellantis = StellantisVehicles(hass)
+        stellantis.set_mobile_app(config[FIELD_MOBILE_APP], config[FIELD_COUNTRY_CODE])
+        stellantis.save_config(config)
+        stellantis.set_entry(entry)
+        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = stellantis
+
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        setup_started = time.perf_counter()
+
+        vehicles = await stellantis.get_user_vehicles()
+        vehicles_done = time.perf_counter()
+        pictures_task = asyncio.create_task(stellantis.async_load_pictures())
+
+        # Same as async_get_coordinator, with the translations read once from disk
+        for vehicle in vehicles:
+            stellantis._coordinator_dict[vehicle["vin"]] = StellantisVehicleCoordinator(hass, stellantis._config, vehicle, stellantis, translations)
+        coordinators = list(stellantis._coordinator_dict.values())
+
+        entities = []
+        for platform in platforms:
+            await platform.async_setup_entry(hass, entry, entities.extend)
+        state_writes = [0]
+        def count_write():
+            state_writes[0] += 1
+        for entity in entities:
+            entity.hass = hass
+            entity.async_write_ha_state = count_write
+            entity._coordinator.async_add_listener(entity._handle_coordinator_update)
+        entities_done = time.perf_counter()
+
+        await asyncio.gather(*[coordinator.async_refresh() for coordinator in coordinators])
+        setup_done = time.perf_counter()
+        await pictures_task
+        pictures_done = time.perf_counter()
+        memory_after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # Steady state, driven by the account poll scheduler at a fixed shortened interval
+        polls = [0]
+        for coordinator in coordinators:
+            coordinator.poll_interval = args.interval
+            coordinator.update_polling_interval = lambda data_changed: None
+            update_data = coordinator._async_update_data
+            async def counted_update(update_data=update_data):
+                polls[0] += 1
+                return await update_data()
+            coordinator._async_update_data = counted_update
+            stellantis._poll_scheduler.add(coordinator)
+        state_writes[0] = 0
+        requests_before = count_requests(stellantis)
+
+        lag = []
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(probe_loop_lag(lag, stop))
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        cpu = time.process_time() - cpu_started
+        wall = time.perf_counter() - wall_started
+        stop.set()
+        await lag_task
+
+        stellantis.stop_polling()
+        requests_after = count_requests(stellantis)
+        await async_close_shared_session(hass)
+
+    lag.sort()
+    return {
+        "vehicles": len(vehicles),
+        "entities": len(entities),
+        "setup_s": {
+            "vehicles": round(vehicles_done - setup_started, 3),
+            "entities": round(entities_done - vehicles_done, 3),
+            "first_refresh": round(setup_done - entities_done, 3),
+            "total": round(setup_done - setup_started, 3),
+            "pictures_background": round(pictures_done - vehicles_done, 3)
+        },
+        "memory_per_vehicle_kb": round((memory_after - memory_before) / max(len(vehicles), 1) / 1024, 1),
+        "cpu_s_per_minute": round(cpu / wall * 60, 3),
+        "loop_lag_ms": {
+            "p50": round(statistics.median(lag) * 1000, 2) if lag else None,
+            "p99": round(lag[int(0.99 * (len(lag) - 1))] * 1000, 2) if lag else None,
+            "max": round(lag[-1] * 1000, 2) if lag else None
+        },
+        "polls": polls[0],
+        "state_writes_per_poll": round(state_writes[0] / polls[0], 2) if polls[0] else None,
+        "http_requests_per_poll": round((requests_after - requests_before) / polls[0], 2) if polls[0] else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[100])
+    parser.add_argument("--interval", type=float, default=10, help="poll interval of the steady state, seconds")
+    parser.add_argument("--duration", type=float, default=120, help="steady state duration, seconds")
+    parser.add_argument("--port", type=int, default=CLOUD_PORT)
+    parser.add_argument("--output", default=None, help="write the results as JSON")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    os.environ["STELLANTIS_OAUTH_URL"] = base_url
+    os.environ["STELLANTIS_API_URL"] = base_url
+    os.environ["STELLANTIS_ABRP_URL"] = base_url
+
+    results = []
+    for vehicle_count in args.vehicles:
+        cloud = start_cloud(vehicle_count, args.port, args.interval)
+        try:
+            result = asyncio.run(run_scenario(args))
+        finally:
+            cloud.terminate()
+            cloud.wait()
+        results.append(result)
+        print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Micro-benchmarks of the helpers running on every update or log line.
+
+Covers the PT duration / date helpers, placeholder rendering, the log
+anonymizer with 10/100/1000 secrets, the entity value maps, the command
+history of the coordinator and the OTP tokenizer.
+
+Results are compared with a baseline file (benchmarks/baselines/micro.json by
+default); cases slower than the threshold are reported, and --check makes the
+run fail on them. Baselines depend on the machine, record them on the box the
+comparison runs on:
+
+    python -m benchmarks.micro --save-baseline
+    python -m benchmarks.micro --check --threshold 1.3
+    python -m benchmarks.micro --filter sensitive
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+from custom_components.stellantis_vehicles import utils
+from custom_components.stellantis_vehicles.base import ( StellantisBaseEntity, StellantisVehicleCoordinator )
+from custom_components.stellantis_vehicles.stellantis import StellantisBase
+from custom_components.stellantis_vehicles.otp.load import DEFAULT_TOKEN
+from custom_components.stellantis_vehicles.otp.tokenizer import Tokenizer
+from custom_components.stellantis_vehicles.const import (
+    FIELD_ANONYMIZE_LOGS,
+    CAR_API_HEADERS,
+    CAR_API_GET_VEHICLE_STATUS_URL,
+    SENSORS_DEFAULT
+)
+
+from .payloads import ( vin_for, vehicle_status )
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "micro.json")
+REPEAT = 5
+
+CASES = {}
+
+
+def case(name):
+    """ Register a case: the decorated function does the setup and returns the callable to time. """
+    def decorator(func):
+        CASES[name] = func
+        return func
+    return decorator
+
+
+# utils
+
+@case("utils.time_from_pt_string")
+def _():
+    return lambda: utils.time_from_pt_string("PT2H35M")
+
+
+@case("utils.date_from_pt_string")
+def _():
+    start = utils.get_datetime()
+    return lambda: utils.date_from_pt_string("PT2H35M", start)
+
+
+@case("utils.get_datetime (now)")
+def _():
+    return utils.get_datetime
+
+
+@case("utils.get_datetime (naive)")
+def _():
+    date = datetime(2025, 1, 1, 12, 30)
+    return lambda: utils.get_datetime(date)
+
+
+@case("utils.replace_string_placeholders")
+def _():
+    placeholders = {"vin": vin_for(0), "customer_id": "AP-FAKECUSTOMER", "culture": "fr-FR"}
+    string = "{customer_id}/{vin}/status?culture={culture}"
+    return lambda: utils.replace_string_placeholders(string, placeholders)
+
+
+def sensitive_filter(secrets):
+    data_filter = utils.SensitiveDataFilter()
+    data_filter.add_entry_values({FIELD_ANONYMIZE_LOGS: True, "oauth": {"access_token": uuid4().hex, "refresh_token": uuid4().hex}})
+    for _ in range(secrets):
+        data_filter.add_custom_value(uuid4().hex)
+    message = f"GET https://api.groupe-psa.com/connectedcar/v4/user/vehicles/{data_filter.custom_values[-1]}/status headers={{'Authorization': 'Bearer {uuid4().hex}'}}"
+    record = logging.LogRecord("bench", logging.DEBUG, __file__, 0, message, None, None)
+    def run():
+        record.msg = message
+        data_filter.filter(record)
+    return run
+
+
+for _secrets in [10, 100, 1000]:
+    case(f"SensitiveDataFilter.filter ({_secrets} secrets)")(lambda secrets=_secrets: sensitive_filter(secrets))
+
+
+# Integration objects
+
+@case("StellantisBase.replace_placeholders")
+def _():
+    stellantis = StellantisBase(None)
+    stellantis._config = {"client_id": uuid4().hex, "realm": "clientsB2CPeugeot", "oauth": {"access_token": uuid4().hex}}
+    vehicle = {"vehicle_id": "vehicle-00000", "vin": vin_for(0)}
+    return lambda: stellantis.replace_placeholders(CAR_API_GET_VEHICLE_STATUS_URL, vehicle)
+
+
+@case("StellantisBase.apply_dict_params")
+def _():
+    stellantis = StellantisBase(None)
+    stellantis._config = {"client_id": uuid4().hex, "realm": "clientsB2CPeugeot", "oauth": {"access_token": uuid4().hex}}
+    return lambda: stellantis.apply_dict_params(CAR_API_HEADERS)
+
+
+@case("StellantisBaseEntity.get_value_from_map (all sensors)")
+def _():
+    entity = SimpleNamespace(_coordinator=SimpleNamespace(_data=vehicle_status("Hybrid", charging=True, seed=1)))
+    value_maps = [sensor["value_map"] for sensor in SENSORS_DEFAULT.values() if sensor.get("value_map")]
+    def run():
+        for value_map in value_maps:
+            StellantisBaseEntity.get_value_from_map(entity, value_map)
+    return run
+
+
+def command_history(actions):
+    start = datetime(2025, 1, 1, 12, 0)
+    coordinator = SimpleNamespace(_commands_history={}, get_translation=lambda path, default=None: default)
+    for index in range(actions):
+        coordinator._commands_history[uuid4().hex] = {
+            "name": "Horn",
+            "updates": [{"info": code, "date": start + timedelta(minutes=index, seconds=offset)} for offset, code in enumerate(["99", "0"])]
+        }
+    return lambda: StellantisVehicleCoordinator.command_history.fget(coordinator)
+
+
+for _actions in [10, 100, 1000]:
+    case(f"StellantisVehicleCoordinator.command_history ({_actions} commands)")(lambda actions=_actions: command_history(actions))
+
+
+# OTP
+
+@case("otp.Tokenizer (default token)")
+def _():
+    def run():
+        tokenizer = Tokenizer(DEFAULT_TOKEN)
+        while tokenizer.hasMoreTokens():
+            tokenizer.nextToken()
+    return run
+
+
+def measure(func):
+    """ Best time per call in nanoseconds. """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.3, help="slowdown ratio reported as a regression")
+    parser.add_argument("--check", action="store_true", help="exit with an error on regressions")
+    parser.add_argument("--filter", default=None, help="run only the cases containing this text")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    regressions = []
+    for name, setup in CASES.items():
+        if args.filter and args.filter.lower() not in name.lower():
+            continue
+        results[name] = round(measure(setup()), 1)
+        line = f"{name:<64} {results[name]:>12.1f} ns"
+        if name in baseline:
+            ratio = results[name] / baseline[name]
+            line += f"  x{ratio:.2f}"
+            if ratio > args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "date": datetime.now().isoformat(),
+                "results": {**baseline, **results}
+            }, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over x{args.threshold}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Synthetic Stellantis API payloads shared by the benchmarks and the stand-in servers."""
+import random
+from datetime import datetime, timedelta, timezone
+
+VEHICLE_TYPES = ["Electric", "Hybrid", "Thermic"]
+
+
+def iso(date):
+    return date.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def vin_for(index):
+    return f"VR3SIMULATED{index:05d}"
+
+
+def vehicle_for(index, base_url="http://127.0.0.1:8080"):
+    """ Entry of the /vehicles list. """
+    return {
+        "id": f"vehicle-{index:05d}",
+        "vin": vin_for(index),
+        "motorization": VEHICLE_TYPES[index % len(VEHICLE_TYPES)],
+        "pictures": [f"{base_url}/pictures/{vin_for(index)}.png"]
+    }
+
+
+def vehicles_list(count, base_url="http://127.0.0.1:8080"):
+    return {
+        "total": count,
+        "_embedded": {"vehicles": [vehicle_for(index, base_url) for index in range(count)]}
+    }
+
+
+def vehicle_status(vehicle_type="Electric", moving=False, charging=False, updated_at=None, seed=None):
+    """ Status payload covering every value_map / updated_at_map of SENSORS_DEFAULT and BINARY_SENSORS_DEFAULT. """
+    rnd = random.Random(seed)
+    if updated_at is None:
+        updated_at = datetime.now(timezone.utc)
+    created_at = iso(updated_at)
+    electric = {
+        "type": "Electric",
+        "createdAt": created_at,
+        "updatedAt": created_at,
+        "level": rnd.randint(10, 100),
+        "autonomy": rnd.randint(20, 400),
+        "extension": {
+            "electric": {
+                "battery": {
+                    "health": {"resistance": 98, "capacity": 97},
+                    "load": {"capacity": 46000, "residual": rnd.randint(5000, 46000)}
+                },
+                "charging": {
+                    "plugged": charging,
+                    "status": "InProgress" if charging else "Disconnected",
+                    "remainingTime": "PT2H35M" if charging else "PT0S",
+                    "chargingRate": 20 if charging else 0,
+                    "chargingMode": "Slow" if charging else "No",
+                    "nextDelayedTime": "PT22H30M"
+                }
+            }
+        }
+    }
+    fuel = {
+        "type": "Fuel",
+        "createdAt": created_at,
+        "updatedAt": created_at,
+        "level": rnd.randint(5, 100),
+        "autonomy": rnd.randint(50, 900),
+        "extension": {"fuel": {"consumptions": {"total": rnd.randint(1000, 90000), "instant": 5.4}}}
+    }
+    energies = []
+    if vehicle_type in ["Electric", "Hybrid"]:
+        energies.append(electric)
+    if vehicle_type in ["Thermic", "Hybrid"]:
+        energies.append(fuel)
+    status = {
+        "createdAt": created_at,
+        "battery": {"createdAt": created_at, "voltage": 82.5},
+        "environment": {
+            "createdAt": created_at,
+            "air": {"createdAt": created_at, "temp": rnd.randint(-5, 35)},
+            "luminosity": {"createdAt": created_at, "day": True}
+        },
+        "odometer": {"createdAt": created_at, "mileage": round(rnd.uniform(100, 150000), 1)},
+        "kinetic": {"createdAt": created_at, "moving": moving, "speed": rnd.randint(10, 130) if moving else 0},
+        "energies": energies,
+        "energy": energies,
+        "ignition": {"createdAt": created_at, "type": "StartUp" if moving else "Stop"},
+        "doorsState": {"createdAt": created_at, "lockedStates": ["Unlocked"] if moving else ["Locked", "SuperLocked"]},
+        "preconditioning": {"airConditioning": {"createdAt": created_at, "updatedAt": created_at, "status": "Disabled"}},
+        "preconditionning": {"airConditioning": {"createdAt": created_at, "updatedAt": created_at, "status": "Disabled", "programs": []}},
+        "alarm": {"status": {"createdAt": created_at, "activation": "Inactive"}},
+        "privacy": {"createdAt": created_at, "state": "None"},
+        "lastPosition": {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [rnd.uniform(7.5, 7.8), rnd.uniform(45.0, 45.2), 240.0]},
+            "properties": {"createdAt": created_at, "updatedAt": created_at, "heading": rnd.randint(0, 359), "type": "Acquire"}
+        }
+    }
+    if vehicle_type in ["Thermic", "Hybrid"]:
+        status["engines"] = [{
+            "createdAt": created_at,
+            "type": "Thermic",
+            "extension": {"thermic": {"coolant": {"temp": 88}, "oil": {"temp": 95}, "air": {"temp": 22}}}
+        }]
+    return status
+
+
+def vehicle_trips(count=1, page_size=60, page=0, end=None):
+    """ Page of the trips endpoint. """
+    if end is None:
+        end = datetime.now(timezone.utc)
+    start_index = page * page_size
+    trips = []
+    for index in range(start_index, min(count, start_index + page_size)):
+        trip_end = end - timedelta(hours=(count - index))
+        trips.append({
+            "id": f"trip-{index:06d}",
+            "startedAt": iso(trip_end - timedelta(minutes=25)),
+            "stoppedAt": iso(trip_end),
+            "distance": 18.4,
+            "duration": 1500,
+            "startMileage": 1000 + index * 18.4,
+            "kinetic": {"avgSpeed": 12.2, "maxSpeed": 110},
+            "energyConsumptions": [{"type": "Electric", "consumption": 2800, "avgConsumption": 15200}]
+        })
+    return {"total": count, "_embedded": {"trips": trips}}
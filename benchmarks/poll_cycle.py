@@ -0,0 +1,243 @@
+"""End-to-end benchmark of one poll cycle.
+
+Runs StellantisVehicleCoordinator._async_update_data followed by the
+coordinator_update of every sensor / binary sensor entity (all of
+SENSORS_DEFAULT and BINARY_SENSORS_DEFAULT plus the extra ones) for an
+electric, a hybrid and a thermic vehicle, against canned status payloads.
+
+Reports wall time, allocations (tracemalloc) and per-entity cost, and writes
+them to benchmarks/results/poll_cycle-<version>.json so two releases can be
+compared:
+
+    python -m benchmarks.poll_cycle --cycles 200
+    python -m benchmarks.poll_cycle --compare benchmarks/results/poll_cycle-3.0.0.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.stellantis_vehicles import ( sensor, binary_sensor )
+from custom_components.stellantis_vehicles.base import StellantisVehicleCoordinator
+from custom_components.stellantis_vehicles.const import ( DOMAIN, FIELD_MOBILE_APP, manifest )
+
+from .payloads import ( VEHICLE_TYPES, vin_for, vehicle_status, vehicle_trips )
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class CannedStellantis:
+    """ Stand-in of StellantisVehicles serving canned status payloads, without I/O. """
+    def __init__(self, hass, vehicles, payloads):
+        self._hass = hass
+        self._vehicles = vehicles
+        self._payloads = payloads   # vin -> list of status payloads, served round robin
+        self._served = {}
+        self._changed = {}
+        self._coordinator_dict = {}
+        self._mqtt = None
+        self.logger_filter = None
+        self.remote_commands = True
+
+    async def get_user_vehicles(self):
+        return self._vehicles
+
+    async def async_get_coordinator(self, vehicle):
+        if vehicle["vin"] not in self._coordinator_dict:
+            config = {FIELD_MOBILE_APP: "MyPeugeot", "country_code": "FR"}
+            self._coordinator_dict[vehicle["vin"]] = StellantisVehicleCoordinator(self._hass, config, vehicle, self, {})
+        return self._coordinator_dict[vehicle["vin"]]
+
+    async def get_vehicle_status(self, vehicle, priority=None):
+        vin = vehicle["vin"]
+        payloads = self._payloads[vin]
+        index = self._served.get(vin, -1) + 1
+        self._served[vin] = index
+        self._changed[vin] = len(payloads) > 1 or index == 0
+        return payloads[index % len(payloads)]
+
+    def vehicle_status_changed(self, vehicle):
+        return self._changed.get(vehicle["vin"], True)
+
+    def get_budget_interval(self, coordinator):
+        return 0
+
+    def save_snapshot(self, coordinator):
+        pass
+
+    async def get_vehicle_last_trip(self, vehicle, page_token=False):
+        return vehicle_trips(3)
+
+
+def status_payloads(vehicle_type, count, index):
+    """ Successive payloads of a vehicle: moving/charging flip and values drift at each upload. """
+    start = datetime.now(timezone.utc)
+    return [
+        vehicle_status(
+            vehicle_type,
+            moving=bool(cycle % 2),
+            charging=vehicle_type != "Thermic" and not cycle % 2,
+            updated_at=start + timedelta(minutes=cycle),
+            seed=f"{index}-{cycle}"
+        )
+        for cycle in range(count)
+    ]
+
+
+async def setup_entities(stellantis):
+    """ Create the sensor and binary sensor entities like Home Assistant does at setup. """
+    entry_id = "benchmark"
+    stellantis._hass.data.setdefault(DOMAIN, {})[entry_id] = stellantis
+    entry = type("Entry", (), {"entry_id": entry_id})()
+    entities = []
+    await sensor.async_setup_entry(stellantis._hass, entry, entities.extend)
+    await binary_sensor.async_setup_entry(stellantis._hass, entry, entities.extend)
+    return entities
+
+
+def entity_name(entity):
+    return f"{type(entity).__name__}:{entity._key}"
+
+
+async def run_cycles(coordinators, entities, cycles):
+    """ Poll cycles as Home Assistant runs them: update data, then notify entities if the data revision changed. """
+    by_coordinator = {}
+    for entity in entities:
+        by_coordinator.setdefault(entity._coordinator, []).append(entity)
+
+    wall = []
+    entity_cost = {}
+    entity_updates = {}
+    skipped = 0
+    for _ in range(cycles):
+        started = time.perf_counter()
+        for coordinator in coordinators:
+            revision = await coordinator._async_update_data()
+            if revision == coordinator.data:
+                skipped += 1
+                continue
+            coordinator.data = revision
+            for entity in by_coordinator.get(coordinator, []):
+                entity_started = time.perf_counter()
+                entity.coordinator_update()
+                name = entity_name(entity)
+                entity_cost[name] = entity_cost.get(name, 0) + time.perf_counter() - entity_started
+                entity_updates[name] = entity_updates.get(name, 0) + 1
+        wall.append(time.perf_counter() - started)
+    entity_cost = {name: cost / entity_updates[name] for name, cost in entity_cost.items()}
+    return wall, entity_cost, skipped
+
+
+async def measure(hass, payloads_per_vehicle, cycles):
+    vehicles = []
+    payloads = {}
+    for index, vehicle_type in enumerate(VEHICLE_TYPES):
+        vin = vin_for(index)
+        vehicles.append({"vehicle_id": f"vehicle-{index:05d}", "vin": vin, "type": vehicle_type})
+        payloads[vin] = status_payloads(vehicle_type, payloads_per_vehicle, index)
+
+    stellantis = CannedStellantis(hass, vehicles, payloads)
+    entities = await setup_entities(stellantis)
+    coordinators = list(stellantis._coordinator_dict.values())
+
+    # Warm up (first payload), then timed run, then allocations on a separate run
+    await run_cycles(coordinators, entities, 1)
+    wall, entity_cost, skipped = await run_cycles(coordinators, entities, cycles)
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    await run_cycles(coordinators, entities, cycles)
+    snapshot_after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, "filename") if stat.size_diff > 0)
+    allocations = sum(stat.count_diff for stat in snapshot_after.compare_to(snapshot_before, "filename") if stat.count_diff > 0)
+
+    wall.sort()
+    return {
+        "entities": {vehicle["type"]: sum(1 for entity in entities if entity._vehicle is vehicle) for vehicle in vehicles},
+        "cycles": cycles,
+        "skipped_entity_updates": skipped,
+        "cycle_ms": {
+            "median": round(statistics.median(wall) * 1000, 4),
+            "p95": round(wall[int(0.95 * (len(wall) - 1))] * 1000, 4),
+            "max": round(wall[-1] * 1000, 4)
+        },
+        "tracemalloc": {
+            "retained_bytes_per_cycle": round(allocated / cycles),
+            "retained_blocks_per_cycle": round(allocations / cycles),
+            "peak_bytes": peak
+        },
+        "entity_us": {
+            name: round(cost * 1e6, 3)
+            for name, cost in sorted(entity_cost.items(), key=lambda item: item[1], reverse=True)
+        }
+    }
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        results = {
+            "version": manifest["version"],
+            "python": platform.python_version(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            # Every poll returns a new payload
+            "changing": await measure(hass, args.payloads, args.cycles),
+            # Every poll returns the same payload, entities are not updated
+            "unchanged": await measure(hass, 1, args.cycles)
+        }
+    return results
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous['version']} ({previous_path})")
+    for scenario in ["changing", "unchanged"]:
+        before = previous[scenario]["cycle_ms"]["median"]
+        after = results[scenario]["cycle_ms"]["median"]
+        print(f"  {scenario:<10} median {before:.3f} ms -> {after:.3f} ms ({(after - before) / before * 100:+.1f}%)")
+    before_entities = previous["changing"]["entity_us"]
+    for name, cost in results["changing"]["entity_us"].items():
+        if name in before_entities and before_entities[name] and cost > before_entities[name] * 1.25:
+            print(f"  slower entity {name}: {before_entities[name]:.2f} us -> {cost:.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=200)
+    parser.add_argument("--payloads", type=int, default=10, help="distinct status payloads per vehicle")
+    parser.add_argument("--output", default=None, help="results file, default benchmarks/results/poll_cycle-<version>.json")
+    parser.add_argument("--compare", default=None, help="previous results file")
+    parser.add_argument("--top", type=int, default=10, help="most expensive entities to print")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for scenario in ["changing", "unchanged"]:
+        data = results[scenario]
+        print(f"{scenario:<10} {data['cycle_ms']['median']:.3f} ms/cycle (p95 {data['cycle_ms']['p95']:.3f} ms), "
+              f"{data['tracemalloc']['retained_bytes_per_cycle']} B retained/cycle, entities {data['entities']}")
+    print("\nMost expensive entities (us per update):")
+    for name, cost in list(results["changing"]["entity_us"].items())[:args.top]:
+        print(f"  {name:<48} {cost:8.2f}")
+
+    output = args.output or os.path.join(RESULTS_PATH, f"poll_cycle-{results['version']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,13 @@ from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.helpers import issue_registry
+from homeassistant.helpers.storage import Store
 from homeassistant.components.frontend import add_extra_js_url
 from homeassistant.components.http import StaticPathConfig
 
 from .stellantis import StellantisVehicles
+from .session import async_close_shared_session
+from .pictures import ( StellantisPictureView, DATA_PICTURE_VIEW )
 from .exceptions import ComunicationError
 from .config_flow import StellantisVehiclesConfigFlow
 
@@ -28,7 +31,12 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry):
     stellantis = StellantisVehicles(hass)
     stellantis.save_config(config.data)
     stellantis.set_entry(config)
-    await stellantis.scheduled_tokens_refresh()
+    await stellantis.async_load_budget()
+    await stellantis.async_load_snapshots()
+    await stellantis.async_load_catalog()
+    # Only the OAuth token is needed by the API requests, MQTT starts in background
+    stellantis.reset_scheduled_tokens()
+    await stellantis.scheduled_oauth_token_refresh()
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][config.entry_id] = stellantis
@@ -41,15 +49,21 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry):
         vehicles = {}
 
     if vehicles:
+        if stellantis.vehicles_from_catalog:
+            stellantis.async_create_setup_task(stellantis.async_revalidate_catalog(), "revalidate vehicles")
+        stellantis.async_create_setup_task(stellantis.async_start_mqtt(), "start mqtt")
+        stellantis.async_create_setup_task(stellantis.async_load_pictures(), "load pictures")
         await hass.config_entries.async_forward_entry_setups(config, PLATFORMS)
     else:
         _LOGGER.warning("No vehicles found for this account")
         await stellantis.hass_notify("no_vehicles_found")
         await stellantis.close_session()
 
-    for vehicle in vehicles:
-        coordinator = await stellantis.async_get_coordinator(vehicle)
-        await coordinator.async_config_entry_first_refresh()
+    await stellantis.async_first_refresh(vehicles)
+
+    if DATA_PICTURE_VIEW not in hass.data:
+        hass.http.register_view(StellantisPictureView(hass))
+        hass.data[DATA_PICTURE_VIEW] = True
 
     url = f"/stellantis_vehicles/{INTEGRATION_VERSION}/stellantis-vehicle-card.js"
     if url not in hass.data["frontend_extra_module_url"].urls:
@@ -68,9 +82,15 @@ async def async_unload_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
             stellantis._mqtt.disconnect()
 
         stellantis.reset_scheduled_tokens()
+        stellantis.cancel_setup_tasks()
+        stellantis.stop_polling()
+        await stellantis.async_flush_stores()
 
         hass.data[DOMAIN].pop(config.entry_id)
 
+        if not hass.data[DOMAIN]:
+            await async_close_shared_session(hass)
+
     return unload_ok
 
 
@@ -96,6 +116,11 @@ async def async_remove_entry(hass: HomeAssistant, config: ConfigEntry) -> None:
             _LOGGER.debug(f"Deleting OTP-File: {otp_file_path}")
             os.remove(otp_file_path)
 
+        # Remove the stores of the entry (vehicles, vehicle snapshots, API budget), Store cancels its pending writes
+        for store_name in ["vehicles", "snapshot", "api_budget"]:
+            _LOGGER.debug(f"Deleting store: {config.unique_id}_{store_name}")
+            await Store(hass, 1, f"{DOMAIN}/{config.unique_id}_{store_name}").async_remove()
+
         # Remove storage folder if empty
         if os.path.exists(storage_path) and os.path.isdir(storage_path) and not os.listdir(storage_path):
             _LOGGER.debug(f"Deleting empty Stellantis storage folder: {storage_path}")
@@ -1,7 +1,7 @@
 import logging
+import asyncio
 import re
-from datetime import datetime, timedelta, UTC
-import json
+from datetime import datetime, UTC
 from copy import deepcopy
 
 from homeassistant.helpers.update_coordinator import ( CoordinatorEntity, DataUpdateCoordinator )
@@ -18,7 +18,11 @@ from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.const import ( STATE_UNAVAILABLE, STATE_UNKNOWN, STATE_ON, STATE_OFF)
 from homeassistant.exceptions import ConfigEntryAuthFailed
 
-from .utils import ( time_from_pt_string, get_datetime, date_from_pt_string, time_from_string, rate_limit )
+from .utils import ( time_from_pt_string, get_datetime, date_from_pt_string, time_from_string, rate_limit, get_value_from_map )
+from .codec import json_dumps
+from .scheduler import ( PRIORITY_COMMAND, PRIORITY_STATUS )
+from .polling import ( PollingPolicy, get_upload_timestamp )
+from .verification import ( get_command_expectation, get_verify_delays, COMMAND_CONFIRMED, COMMAND_UNCONFIRMED )
 
 from .const import (
     DOMAIN,
@@ -26,6 +30,7 @@ from .const import (
     VEHICLE_TYPE_ELECTRIC,
     VEHICLE_TYPE_HYBRID,
     UPDATE_INTERVAL,
+    COMMAND_VERIFY_TIMEOUT,
     KWH_CORRECTION
 )
 
@@ -33,7 +38,9 @@ _LOGGER = logging.getLogger(__name__)
 
 class StellantisVehicleCoordinator(DataUpdateCoordinator):
     def __init__(self, hass:HomeAssistant, config, vehicle, stellantis, translations) -> None:
-        super().__init__(hass, _LOGGER, name = DOMAIN, update_interval=timedelta(seconds=UPDATE_INTERVAL))
+        # always_update=False: entities are updated only when the data revision changes
+        # No private timer (update_interval=None), the polls are driven by the PollScheduler of the account
+        super().__init__(hass, _LOGGER, name = DOMAIN, update_interval=None, always_update=False)
 
         self._hass = hass
         self._translations = translations
@@ -44,9 +51,16 @@ class StellantisVehicleCoordinator(DataUpdateCoordinator):
         self._sensors = {}
         self._commands_history = {}
         self._disabled_commands = []
+        self._command_verifications = {}
         self._last_trip = None
 #        self._total_trip = None
         self._manage_charge_limit_sent = False
+        self._data_revision = 0
+        self._local_change = False
+        self._entities_update_requested = False
+        self._polling = PollingPolicy()
+        self.poll_interval = UPDATE_INTERVAL
+        self.warm_started = False
 
         if self._stellantis.logger_filter:
             _LOGGER.addFilter(self._stellantis.logger_filter)
@@ -55,16 +69,50 @@ class StellantisVehicleCoordinator(DataUpdateCoordinator):
         """ Update vehicle data from Stellantis. """
         _LOGGER.debug("---------- START _async_update_data")
         _LOGGER.debug(self._config)
+        data_changed = False
         try:
             # Vehicle status
-            self._data = await self._stellantis.get_vehicle_status(self._vehicle)
+            # Refreshes asked by a user action go before the regular polls
+            priority = PRIORITY_COMMAND if self._local_change or self._command_verifications else PRIORITY_STATUS
+            self._data = await self._stellantis.get_vehicle_status(self._vehicle, priority)
+            data_changed = self._stellantis.vehicle_status_changed(self._vehicle)
+            if data_changed:
+                self._stellantis.save_snapshot(self)
         except ConfigEntryAuthFailed:
             _LOGGER.debug("---------- END _async_update_data")
             raise
         except Exception:
             pass
         await self.after_async_update_data()
+        self.update_polling_interval(data_changed)
+        if data_changed or self._local_change or self._entities_update_requested or not self._data_revision:
+            self._data_revision += 1
+        else:
+            _LOGGER.debug("Vehicle status unchanged, skip entities update")
+        self._local_change = False
+        self._entities_update_requested = False
         _LOGGER.debug("---------- END _async_update_data")
+        return self._data_revision
+
+    def restore_snapshot(self, snapshot):
+        """ Start from the last saved status, the entities come up before the first refresh. """
+        if not snapshot:
+            return
+        self._data = snapshot["data"]
+        self._sensors.update(snapshot["sensors"])
+        self._last_trip = snapshot.get("last_trip")
+        self._data_revision += 1
+        self.data = self._data_revision
+        self.warm_started = True
+
+    def request_entities_update(self):
+        """ Entities are updated on the next poll even if the vehicle status is unchanged (state depending on the passing of updates). """
+        self._entities_update_requested = True
+
+    async def async_refresh_after_change(self):
+        """ Refresh after a local setting change, entities are updated even if the vehicle status is unchanged. """
+        self._local_change = True
+        await self.async_refresh()
 
     def get_translation(self, path, default = None):
         """ Get translation from path. """
@@ -113,6 +161,50 @@ class StellantisVehicleCoordinator(DataUpdateCoordinator):
                 self._disabled_commands.append(self._commands_history[action_id]["name"])
         self.async_update_listeners()
 
+    def async_verify_command(self, action_id):
+        """ Verify in background that a completed command had the expected effect on the vehicle status. """
+        command = self._commands_history.get(action_id)
+        if not command or "service" not in command:
+            return
+        # A new command on the same service supersedes the previous one
+        previous = self._command_verifications.pop(command["service"], None)
+        if previous:
+            previous.cancel()
+        task = self._hass.async_create_background_task(self.verify_command(action_id, command), f"{DOMAIN} verify {command['name']} {self._vehicle['vin']}")
+        self._command_verifications[command["service"]] = task
+
+    async def verify_command(self, action_id, command):
+        """ Poll with backoff until the vehicle status shows the effect of the command, or the timeout. """
+        _LOGGER.debug("---------- START verify_command")
+        try:
+            expectation = get_command_expectation(command["service"], command["message"])
+            delays = get_verify_delays(COMMAND_VERIFY_TIMEOUT)
+            if expectation is None:
+                # Nothing to check in the status (horn, lights): one refresh
+                await asyncio.sleep(delays[0])
+                await self.async_refresh()
+                return
+            _LOGGER.debug(f"Expected: {command['name']} -> {expectation.description}")
+            result = COMMAND_UNCONFIRMED
+            for delay in delays:
+                await asyncio.sleep(delay)
+                await self.async_refresh()
+                if expectation.is_met(self._data, command):
+                    result = COMMAND_CONFIRMED
+                    break
+            _LOGGER.debug(f"Result: {result}")
+            await self.update_command_history(action_id, result)
+        finally:
+            if self._command_verifications.get(command["service"]) is asyncio.current_task():
+                del self._command_verifications[command["service"]]
+            _LOGGER.debug("---------- END verify_command")
+
+    def cancel_command_verifications(self):
+        """ Cancel the running command verifications. """
+        for task in list(self._command_verifications.values()):
+            task.cancel()
+        self._command_verifications = {}
+
     def update_command_history_rate_limit(self, name):
         current_datetime = get_datetime()
         self._commands_history.update({current_datetime.time(): {"name": name, "updates": [{"info": "rate_limit", "date": current_datetime}]}})
@@ -123,7 +215,7 @@ class StellantisVehicleCoordinator(DataUpdateCoordinator):
         try:
             action_id = await self._stellantis.send_mqtt_message(service, message, self._vehicle)
             if action_id is not None:
-                self._commands_history.update({action_id: {"name": name, "updates": []}})
+                self._commands_history.update({action_id: {"name": name, "updates": [], "service": service, "message": message, "sent_upload": get_upload_timestamp(self._data)}})
                 self.async_update_listeners()
         except ConfigEntryAuthFailed as e:
             _LOGGER.warning("Authentication failed while sending command '%s' to vehicle '%s': %s", name, self._vehicle['vin'], str(e))
@@ -234,7 +326,7 @@ class StellantisVehicleCoordinator(DataUpdateCoordinator):
         if self._sensors.get("autonomy") is not None:
             tlm["est_battery_range"] = self._sensors.get("autonomy")
 
-        params = {"tlm": json.dumps(tlm), "token": self._sensors.get("text_abrp_token")}
+        params = {"tlm": json_dumps(tlm), "token": self._sensors.get("text_abrp_token")}
         await self._stellantis.send_abrp_data(params)
 
 
@@ -263,8 +355,20 @@ class StellantisVehicleCoordinator(DataUpdateCoordinator):
             if current_engine_status != "Stop" and new_engine_status == "Stop":
                 await self.get_vehicle_last_trip()
 
-        if "number_refresh_interval" in self._sensors and self._sensors.get("number_refresh_interval") > 0 and self._sensors.get("number_refresh_interval") != self._update_interval_seconds:
-            self.update_interval = timedelta(seconds=self._sensors.get("number_refresh_interval"))
+    def update_polling_interval(self, data_changed):
+        """ Adapt the poll interval to the vehicle state. """
+        interval = self._polling.update(self._data, data_changed, self._sensors.get("number_refresh_interval"), self.pending_action)
+        self.poll_interval = max(interval, self._stellantis.get_budget_interval(self))
+
+    @property
+    def upload_poll_delay(self):
+        """ Seconds until the poll just after the next expected telemetry upload, None when unknown. """
+        return self._polling.get_upload_poll_delay(self.poll_interval)
+
+    @property
+    def polling_state(self):
+        """ Adaptive polling state. """
+        return self._polling.as_dict()
 
     async def get_vehicle_last_trip(self):
         """ Get last trip from Stellantis. """
@@ -390,29 +494,7 @@ class StellantisBaseEntity(CoordinatorEntity):
 
     def get_value_from_map(self, value_map):
         """ Get data value from map. """
-        vehicle_data = self._coordinator._data
-        value = None
-        for key in value_map:
-            if value is None: # first key in the map
-                if key in vehicle_data:
-                    value = vehicle_data[key]
-            else: # following keys in the map (value has been set with result of previous key)
-                if isinstance(key, dict):
-                    if isinstance(value, list): # key is a dict and value a list
-                        # Use dictionnary in map as key_field, key_value to look for in value list
-                        key_field, key_value = next(iter(key.items()))
-                        # Select value in list with key_field matching to key_value 
-                        value = next((item for item in value if item.get(key_field) == key_value), None)
-                    else: # set value to None if key is dictionnary and value not a list
-                        value = None
-                elif isinstance(key, int) or key in value:
-                    value = value[key]
-                else: # value not an array and key not found in value
-                    value = None
-            if value is None: # Stop iteration immediately if None value encountered at this stage
-                break
-
-        return value
+        return get_value_from_map(self._coordinator._data, value_map)
 
     def get_value(self, value_map):
         """ Get entity value and convert to HASS style. """
@@ -548,6 +630,9 @@ class StellantisBaseDevice(StellantisBaseEntity, TrackerEntity):
 
     def coordinator_update(self):
         """ Coordinator update. """
+        # Full size picture for the vehicle card, entity_picture is the thumbnail
+        if "picture_full" in self._coordinator._vehicle:
+            self._attr_extra_state_attributes["picture_full"] = self._coordinator._vehicle["picture_full"]
         return True
 
 
@@ -743,7 +828,7 @@ class StellantisBaseNumber(StellantisRestoreEntity, NumberEntity):
         self._coordinator._sensors[self._sensor_key] = float(value)
         vin = self._coordinator._vehicle['vin']
         self._stellantis.update_vehicle_stored_config(vin, self._sensor_key, float(value))
-        await self._coordinator.async_refresh()
+        await self._coordinator.async_refresh_after_change()
 
 
 class StellantisBaseSwitch(StellantisRestoreEntity, SwitchEntity):
@@ -769,7 +854,7 @@ class StellantisBaseSwitch(StellantisRestoreEntity, SwitchEntity):
         self._coordinator._sensors[self._sensor_key] = True
         vin = self._coordinator._vehicle['vin']
         self._stellantis.update_vehicle_stored_config(vin, self._sensor_key, True)
-        await self._coordinator.async_refresh()
+        await self._coordinator.async_refresh_after_change()
 
     async def async_turn_off(self, **kwargs):
         """ Turn off. """
@@ -777,7 +862,7 @@ class StellantisBaseSwitch(StellantisRestoreEntity, SwitchEntity):
         self._coordinator._sensors[self._sensor_key] = False
         vin = self._coordinator._vehicle['vin']
         self._stellantis.update_vehicle_stored_config(vin, self._sensor_key, False)
-        await self._coordinator.async_refresh()
+        await self._coordinator.async_refresh_after_change()
 
 
 class StellantisBaseText(StellantisRestoreEntity, TextEntity):
@@ -803,7 +888,7 @@ class StellantisBaseText(StellantisRestoreEntity, TextEntity):
         self._coordinator._sensors[self._sensor_key] = str(value)
         vin = self._coordinator._vehicle['vin']
         self._stellantis.update_vehicle_stored_config(vin, self._sensor_key, str(value))
-        await self._coordinator.async_refresh()
+        await self._coordinator.async_refresh_after_change()
 
 
 class StellantisBaseTime(StellantisRestoreEntity, TimeEntity):
@@ -0,0 +1,139 @@
+import logging
+import math
+from datetime import datetime, timedelta
+
+from homeassistant.helpers.storage import Store
+
+from .utils import get_datetime
+from .exceptions import ApiBudgetExceededException
+
+from .const import (
+    DOMAIN,
+    BUDGET_RESERVED_SHARE,
+    BUDGET_RESERVED_ENDPOINTS,
+    BUDGET_EXCLUDED_ENDPOINTS,
+    BUDGET_STATE_WEIGHTS,
+    BUDGET_SAVE_DELAY
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+
+class ApiBudget:
+    """ Daily request budget of an account.
+
+    Authentication and vehicles list requests are always sent, a share of the budget is reserved for them.
+    Status polls and trips share what is left, allocated to the vehicles by weight of their polling state.
+    """
+    def __init__(self, hass, daily_budget=0):
+        self._hass = hass
+        self.daily_budget = daily_budget
+        self._day = None
+        self._used = {}
+        self._store = None
+        self._save_pending = False
+        self._listeners = []
+
+    @property
+    def enabled(self):
+        return bool(self.daily_budget) and self.daily_budget > 0
+
+    async def async_load(self, customer_id):
+        """ Restore today's counters, the budget survives restarts. """
+        self._store = Store(self._hass, STORAGE_VERSION, f"{DOMAIN}/{customer_id}_api_budget")
+        data = await self._store.async_load()
+        if data and data.get("day") == self.get_today():
+            self._day = data["day"]
+            self._used = data.get("used", {})
+
+    def get_today(self):
+        return get_datetime().date().isoformat()
+
+    def roll_day(self):
+        today = self.get_today()
+        if self._day != today:
+            self._day = today
+            self._used = {}
+
+    def record(self, endpoint):
+        """ Count a request sent to the API. """
+        if endpoint in BUDGET_EXCLUDED_ENDPOINTS:
+            return
+        self.roll_day()
+        endpoint = endpoint or "other"
+        self._used[endpoint] = self._used.get(endpoint, 0) + 1
+        if self._store is not None:
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, BUDGET_SAVE_DELAY)
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def async_add_listener(self, update_callback):
+        """ Called after every counted request, returns the function removing the listener. """
+        self._listeners.append(update_callback)
+        def remove_listener():
+            self._listeners.remove(update_callback)
+        return remove_listener
+
+    async def async_flush(self):
+        """ Write the pending counters now (unload), the delayed save is cancelled. """
+        if self._store is not None and self._save_pending:
+            await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self):
+        self._save_pending = False
+        return {"day": self._day, "used": self._used}
+
+    @property
+    def used(self):
+        self.roll_day()
+        return sum(self._used.values())
+
+    @property
+    def remaining(self):
+        if not self.enabled:
+            return None
+        return max(0, self.daily_budget - self.used)
+
+    @property
+    def polling_remaining(self):
+        """ Requests left for polls and trips, once the unused reserve is set aside. """
+        reserve = math.ceil(self.daily_budget * BUDGET_RESERVED_SHARE)
+        reserve_used = sum(count for endpoint, count in self._used.items() if endpoint in BUDGET_RESERVED_ENDPOINTS)
+        return max(0, self.remaining - max(0, reserve - reserve_used))
+
+    def check(self, endpoint):
+        """ Raise when the request does not fit in the budget. """
+        if not self.enabled or endpoint in BUDGET_RESERVED_ENDPOINTS or endpoint in BUDGET_EXCLUDED_ENDPOINTS:
+            return
+        if self.polling_remaining <= 0:
+            _LOGGER.debug(f"Daily API budget exhausted, {endpoint} request not sent")
+            raise ApiBudgetExceededException("api_budget")
+
+    def get_seconds_left(self):
+        now = get_datetime()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), now.tzinfo)
+        return (midnight - now).total_seconds()
+
+    def get_min_interval(self, state, states):
+        """ Shortest poll interval of a vehicle so the polls of all vehicles fit in the budget until midnight. """
+        if not self.enabled:
+            return 0
+        weights = [BUDGET_STATE_WEIGHTS.get(item, 1) for item in states]
+        share = BUDGET_STATE_WEIGHTS.get(state, 1) / sum(weights) if weights else 1
+        polls = self.polling_remaining * share
+        seconds_left = self.get_seconds_left()
+        if polls < 1:
+            return seconds_left
+        return math.ceil(seconds_left / polls)
+
+    def as_dict(self):
+        return {
+            "daily_budget": self.daily_budget,
+            "day": self._day,
+            "used": dict(self._used),
+            "remaining": self.remaining,
+            "polling_remaining": self.polling_remaining if self.enabled else None
+        }
@@ -0,0 +1,77 @@
+import logging
+import hashlib
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HttpCacheEntry:
+    def __init__(self, result, content_hash, etag=None, last_modified=None):
+        self.result = result
+        self.content_hash = content_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.monotonic()
+        self.changed = True
+
+
+class HttpCache:
+    """ Response cache with validators (ETag / Last-Modified / content hash) and TTL lookups. """
+    def __init__(self):
+        self._entries = {}
+
+    def get_fresh(self, key, ttl):
+        """ Cached result if younger than ttl seconds. """
+        entry = self._entries.get(key)
+        if entry is None or not ttl or (time.monotonic() - entry.stored_at) >= ttl:
+            return None
+        _LOGGER.debug(f"Cache {key}: fresh result")
+        entry.changed = False
+        return entry.result
+
+    def get_validators(self, key):
+        """ Conditional request headers for the cached response. """
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def not_modified(self, key):
+        """ Handle a 304 answer, the cached result is still valid. """
+        entry = self._entries[key]
+        entry.stored_at = time.monotonic()
+        entry.changed = False
+        _LOGGER.debug(f"Cache {key}: not modified")
+        return entry.result
+
+    def store(self, key, result, body, headers=None):
+        """ Store a response, the previous result is kept when the content did not change. """
+        if headers is None:
+            headers = {}
+        content_hash = hashlib.sha1(body).hexdigest()
+        entry = self._entries.get(key)
+        if entry is not None and entry.content_hash == content_hash:
+            entry.stored_at = time.monotonic()
+            entry.etag = headers.get("ETag", entry.etag)
+            entry.last_modified = headers.get("Last-Modified", entry.last_modified)
+            entry.changed = False
+            _LOGGER.debug(f"Cache {key}: content unchanged")
+            return entry.result
+        self._entries[key] = HttpCacheEntry(result, content_hash, headers.get("ETag"), headers.get("Last-Modified"))
+        return result
+
+    def has_changed(self, key):
+        """ If the last response for key was different from the previous one. """
+        entry = self._entries.get(key)
+        return entry is None or entry.changed
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
@@ -0,0 +1,50 @@
+import logging
+
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# Fields identifying the devices, a change of one of them adds or removes devices
+CATALOG_DEVICE_FIELDS = ["vehicle_id", "vin", "type"]
+# Cached picture of a vehicle: URLs (thumbnail, full size), content hash and downloaded source
+PICTURE_FIELDS = ["picture", "picture_full", "picture_hash", "picture_source"]
+
+
+class VehicleCatalog:
+    """ Vehicles of an account (id, vin, motorization, picture), read at setup instead of waiting for the API. """
+    def __init__(self, hass):
+        self._hass = hass
+        self._store = None
+        self.vehicles = []
+
+    async def async_load(self, customer_id):
+        self._store = Store(self._hass, STORAGE_VERSION, f"{DOMAIN}/{customer_id}_vehicles")
+        data = await self._store.async_load()
+        if data:
+            self.vehicles = data.get("vehicles", [])
+
+    async def async_save(self, vehicles):
+        self.vehicles = [dict(vehicle) for vehicle in vehicles]
+        if self._store is not None:
+            await self._store.async_save({"vehicles": self.vehicles})
+
+    async def async_save_pictures(self, vehicles):
+        """ Merge the pictures of the vehicles, the stored list may have been revalidated meanwhile. """
+        pictures = {vehicle["vin"]: {field: vehicle[field] for field in PICTURE_FIELDS if field in vehicle} for vehicle in vehicles}
+        for vehicle in self.vehicles:
+            if vehicle["vin"] in pictures:
+                vehicle.update(pictures[vehicle["vin"]])
+        await self.async_save(self.vehicles)
+
+
+def get_device_keys(vehicles):
+    return sorted(tuple(vehicle.get(field) for field in CATALOG_DEVICE_FIELDS) for vehicle in vehicles)
+
+
+def catalog_changed(current, new):
+    """ Vehicles added, removed or with a new motorization. """
+    return get_device_keys(current) != get_device_keys(new)
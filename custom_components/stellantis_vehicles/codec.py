@@ -0,0 +1,53 @@
+import logging
+import json
+
+from .exceptions import ComunicationError
+from .const import HTTP_MAX_BODY_SIZE
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_LOGGER = logging.getLogger(__name__)
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def json_loads(data):
+    """ Decode JSON from bytes or str with the fastest available backend. """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(data):
+    """ Encode data to a JSON string with the fastest available backend. """
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data)
+
+async def read_body(resp, max_size=HTTP_MAX_BODY_SIZE):
+    """ Read the response body once as bytes, bounded by max_size. """
+    if resp.content_length is not None and resp.content_length > max_size:
+        raise ComunicationError(f"Response body too large: {resp.content_length} bytes")
+    body = bytearray()
+    async for chunk in resp.content.iter_chunked(65536):
+        body.extend(chunk)
+        if len(body) > max_size:
+            raise ComunicationError(f"Response body too large: more than {max_size} bytes")
+    return bytes(body)
+
+def decode_body(body, status):
+    """ Decode a response body, error pages that are not JSON decode to an empty dict. """
+    if not body:
+        return {}
+    try:
+        return json_loads(body)
+    except ValueError:
+        if not str(status).startswith("20"):
+            _LOGGER.debug(f"Response {status} is not JSON: {body[:200]}")
+            return {}
+        # A malformed payload does not fix itself: not retried, not a circuit breaker failure
+        _LOGGER.warning(f"Response {status} is not JSON ({len(body)} bytes)")
+        _LOGGER.debug(f"Response {status} body: {body[:200]}")
+        raise ComunicationError("Invalid JSON response")
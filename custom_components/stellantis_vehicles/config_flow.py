@@ -26,7 +26,10 @@ from .const import (
     FIELD_PIN_CODE,
     FIELD_NOTIFICATIONS,
     FIELD_ANONYMIZE_LOGS,
+    FIELD_DAILY_API_BUDGET,
+    FIELD_MAX_CONCURRENT_REQUESTS,
     FIELD_RECONFIGURE,
+    HTTP_MAX_CONCURRENT_REQUESTS,
     MQTT_REFRESH_TOKEN_TTL,
     TRANSLATION_PLACEHOLDERS
 )
@@ -67,13 +70,17 @@ OTP_SCHEMA = vol.Schema({
 def OPTIONS_SCHEMA(reconfig=None):
     defaults = {
         FIELD_NOTIFICATIONS: True,
-        FIELD_ANONYMIZE_LOGS: True
+        FIELD_ANONYMIZE_LOGS: True,
+        FIELD_DAILY_API_BUDGET: 0,
+        FIELD_MAX_CONCURRENT_REQUESTS: HTTP_MAX_CONCURRENT_REQUESTS
     }
     if reconfig:
         defaults.update(reconfig)
     return vol.Schema({
         vol.Required(FIELD_NOTIFICATIONS, default=defaults[FIELD_NOTIFICATIONS]): bool,
-        vol.Required(FIELD_ANONYMIZE_LOGS, default=defaults[FIELD_ANONYMIZE_LOGS]): bool
+        vol.Required(FIELD_ANONYMIZE_LOGS, default=defaults[FIELD_ANONYMIZE_LOGS]): bool,
+        vol.Required(FIELD_DAILY_API_BUDGET, default=defaults[FIELD_DAILY_API_BUDGET]): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Required(FIELD_MAX_CONCURRENT_REQUESTS, default=defaults[FIELD_MAX_CONCURRENT_REQUESTS]): vol.All(vol.Coerce(int), vol.Range(min=1, max=16))
     })
 
 RECONFIGURE_SCHEMA = vol.Schema({
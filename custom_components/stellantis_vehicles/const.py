@@ -24,13 +24,14 @@ with open(os.path.dirname(os.path.abspath(__file__)) + "/configs.json", "r") as
 MQTT_REFRESH_TOKEN_TTL = (60*24*3) # 3 days
 OTP_FILENAME = "{#customer_id#}_otp.pickle"
 
-OAUTH_BASE_URL = "{#oauth_url#}/am/oauth2"
+# STELLANTIS_*_URL environment variables point the integration to a stand-in server (benchmarks/fake_cloud.py)
+OAUTH_BASE_URL = os.environ.get("STELLANTIS_OAUTH_URL", "{#oauth_url#}") + "/am/oauth2"
 OAUTH_AUTHORIZE_URL = OAUTH_BASE_URL + "/authorize"
 OAUTH_TOKEN_URL = OAUTH_BASE_URL + "/access_token"
 
 OAUTH_CODE_URL = "https://homeassistant-stellantis-vehicles-worker.onrender.com"
 
-API_BASE_URL = "https://api.groupe-psa.com"
+API_BASE_URL = os.environ.get("STELLANTIS_API_URL", "https://api.groupe-psa.com")
 GET_USER_INFO_URL = API_BASE_URL + "/applications/cvs/v4/mauv/car-associations"
 GET_OTP_URL = API_BASE_URL + "/applications/cvs/v4/mobile/smsCode"
 GET_MQTT_TOKEN_URL = API_BASE_URL + "/connectedcar/v4/virtualkey/remoteaccess/token"
@@ -39,9 +40,12 @@ CAR_API_VEHICLES_URL = CAR_API_BASE_URL + "/vehicles"
 CAR_API_GET_VEHICLE_STATUS_URL = CAR_API_VEHICLES_URL + "/{#vehicle_id#}/status"
 CAR_API_GET_VEHICLE_TRIPS_URL = CAR_API_VEHICLES_URL + "/{#vehicle_id#}/trips"
 
-MQTT_SERVER = "mwa.mpsa.com"
-MQTT_PORT = 8885
+# STELLANTIS_MQTT_* environment variables point remote commands to a local broker (benchmarks/fake_mqtt.py)
+MQTT_SERVER = os.environ.get("STELLANTIS_MQTT_SERVER", "mwa.mpsa.com")
+MQTT_PORT = int(os.environ.get("STELLANTIS_MQTT_PORT", "8885"))
+MQTT_TLS = os.environ.get("STELLANTIS_MQTT_TLS", "1") != "0"
 MQTT_KEEP_ALIVE_S = 120
+MQTT_CONNECT_TIMEOUT = 30 # seconds, no new connection while the previous one is pending
 MQTT_RESP_TOPIC = "psa/RemoteServices/to/cid/"
 MQTT_EVENT_TOPIC = "psa/RemoteServices/events/MPHRTServices/"
 MQTT_REQ_TOPIC = "psa/RemoteServices/from/cid/"
@@ -50,7 +54,7 @@ MQTT_QOS = 0
 KWH_CORRECTION = 1.343
 MS_TO_KMH_CONVERSION = 3.6
 
-ABRP_URL = "https://api.iternio.com/1/tlm/send"
+ABRP_URL = os.environ.get("STELLANTIS_ABRP_URL", "https://api.iternio.com") + "/1/tlm/send"
 ABRP_API_KEY = "1e28ad14-df16-49f0-97da-364c9154b44a"
 
 CLIENT_ID_QUERY_PARAMS = {
@@ -108,6 +112,8 @@ FIELD_SMS_CODE = "sms_code"
 FIELD_PIN_CODE = "pin_code"
 FIELD_NOTIFICATIONS = "notifications"
 FIELD_ANONYMIZE_LOGS = "anonymize_logs"
+FIELD_DAILY_API_BUDGET = "daily_api_budget"
+FIELD_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
 FIELD_RECONFIGURE = "reconfigure"
 
 PLATFORMS = [
@@ -123,6 +129,75 @@ PLATFORMS = [
 
 UPDATE_INTERVAL = 60 # seconds
 
+# Adaptive polling, the refresh_interval number is the floor of every interval.
+# Active keeps the baseline on purpose, the refresh_interval number (60 s by default, 30 s minimum) sets it:
+# the policy only slows down the vehicles not in use, it never polls faster than the user asked.
+POLL_INTERVAL_ACTIVE = UPDATE_INTERVAL # seconds, moving, ignition on, charging or preconditioning
+POLL_INTERVAL_PARKED = 300 # seconds, ignition off and doors locked
+POLL_INTERVAL_DORMANT = 1800 # seconds, parked and unchanged data for POLL_DORMANT_AFTER
+POLL_DORMANT_AFTER = 3 * 3600 # seconds
+POLL_MAX_CONCURRENCY = 2 # vehicles of an account refreshed at the same time
+STARTUP_MAX_CONCURRENCY = 4 # vehicles (first refresh, picture) processed at the same time at setup
+
+# Telemetry upload cadence, learnt from the server side timestamps of the status
+UPLOAD_CADENCE_WINDOW = 10 # last intervals between distinct uploads
+UPLOAD_CADENCE_MIN_SAMPLES = 3
+UPLOAD_CADENCE_MIN = 10 # seconds, shorter intervals are ignored
+UPLOAD_CADENCE_MAX = 6 * 3600 # seconds, longer intervals are ignored
+UPLOAD_POLL_MARGIN = 20 # seconds after the expected upload, for the server to publish it
+UPLOAD_MAX_MISSES = 2 # expected uploads not seen before falling back to the interval grid
+
+# Daily API budget of an account (0: no budget)
+BUDGET_RESERVED_SHARE = 0.1 # share of the budget kept for the requests below
+BUDGET_RESERVED_ENDPOINTS = ["token", "oauth_code", "otp_sms", "mqtt_token", "user_info", "vehicles"] # always sent
+BUDGET_EXCLUDED_ENDPOINTS = ["abrp", "picture"] # not Stellantis API
+BUDGET_STATE_WEIGHTS = {"active": 8, "default": 2, "parked": 1, "dormant": 0.25} # share of the polls per polling state
+BUDGET_SAVE_DELAY = 60 # seconds
+
+# Warm start from the last vehicle status
+SNAPSHOT_SAVE_DELAY = 60 # seconds
+SNAPSHOT_MAX_AGE = 7 * 86400 # seconds, older snapshots are ignored
+COMMAND_VERIFY_FIRST_DELAY = 5 # seconds
+COMMAND_VERIFY_BACKOFF = 1.6 # delay factor between the verification polls
+COMMAND_VERIFY_MAX_DELAY = 60 # seconds
+COMMAND_VERIFY_TIMEOUT = 180 # seconds
+
+STATUS_FRESHNESS_WINDOW = 5 # seconds, reuse the just fetched status instead of a new request
+CATALOG_CACHE_TTL = 3600 # seconds, vehicles list and car associations
+
+HTTP_POOL_LIMIT = 100
+HTTP_POOL_LIMIT_PER_HOST = 10
+# Sized to the active interval only: the parked/dormant polls (5 to 30 min apart) reopen TLS on purpose,
+# idle sockets are not held for that long and the API closes them earlier anyway
+HTTP_KEEPALIVE_TIMEOUT = POLL_INTERVAL_ACTIVE + 30 # seconds, longer than the active poll interval
+HTTP_DNS_CACHE_TTL = 300 # seconds
+HTTP_MAX_BODY_SIZE = 5 * 1024 * 1024 # bytes
+HTTP_MAX_CONCURRENT_REQUESTS = 4 # per account, default of the option
+PICTURE_MAX_SIZE = 10 * 1024 * 1024 # bytes, downloaded vehicle picture
+PICTURE_DOWNLOAD_TIMEOUT = 60 # seconds
+PICTURE_VARIANTS = {"thumb": 128, "full": 800} # pixels, square: device tracker, vehicle card
+PICTURE_CACHE_CONTROL = "public, max-age=31536000, immutable" # content addressed URLs
+
+LATENCY_WINDOW = 200 # samples per endpoint
+LATENCY_MIN_SAMPLES = 20 # before timeouts become adaptive
+ADAPTIVE_TIMEOUT_FACTOR = 3 # timeout = p99 x factor
+ADAPTIVE_TIMEOUT_FLOOR = 10 # seconds
+HEDGE_STATUS_REQUESTS = True # second status request when the first one exceeds p95
+
+# Record/replay of the HTTP API for offline profiling, live by default
+HTTP_TRANSPORT_LIVE = "live"
+HTTP_TRANSPORT_RECORD = "record"
+HTTP_TRANSPORT_REPLAY = "replay"
+HTTP_TRANSPORT_MODE = os.environ.get("STELLANTIS_HTTP_MODE", HTTP_TRANSPORT_LIVE)
+HTTP_CASSETTE_PATH = os.environ.get("STELLANTIS_HTTP_CASSETTE")
+HTTP_REPLAY_LATENCY = os.environ.get("STELLANTIS_HTTP_REPLAY_LATENCY", "0") # seconds or "recorded"
+
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1 # seconds
+RETRY_MAX_DELAY = 10 # seconds
+CIRCUIT_BREAKER_THRESHOLD = 5 # consecutive failures
+CIRCUIT_BREAKER_RECOVERY = 300 # seconds before the half-open probe
+
 VEHICLE_TYPE_ELECTRIC = "Electric"
 VEHICLE_TYPE_HYBRID = "Hybrid"
 VEHICLE_TYPE_THERMIC = "Thermic"
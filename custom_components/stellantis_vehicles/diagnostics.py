@@ -0,0 +1,17 @@
+from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """ Diagnostics for a config entry. """
+    stellantis = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "circuit_breakers": stellantis.circuit_breakers_state,
+        "request_scheduler": stellantis.request_scheduler_state,
+        "http_metrics": stellantis.http_metrics_state,
+        "polling": {vin: coordinator.polling_state for vin, coordinator in stellantis._coordinator_dict.items()},
+        "poll_scheduler": stellantis.poll_scheduler_state,
+        "api_budget": stellantis.api_budget.as_dict()
+    }
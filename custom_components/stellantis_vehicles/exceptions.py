@@ -2,4 +2,13 @@ class RateLimitException(Exception):
     pass
 
 class ComunicationError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class ServiceUnavailableError(ComunicationError):
+    pass
+
+class CircuitOpenException(ComunicationError):
+    pass
+
+class ApiBudgetExceededException(RateLimitException):
+    pass
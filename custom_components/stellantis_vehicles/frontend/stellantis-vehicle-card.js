@@ -334,7 +334,7 @@ class StellantisVehicleCard extends LitElement {
             defaults = false;
             entities = this._config[SELECTOR_KEY_IMAGE];
         }
-        const vehicle_img = this._getVehicleEntity().attributes?.entity_picture ?? null;
+        const vehicle_img = this._getVehicleEntity().attributes?.picture_full ?? this._getVehicleEntity().attributes?.entity_picture ?? null;
         if (this._config["hide_"+SELECTOR_KEY_IMAGE] || !vehicle_img) {
             return nothing;
         }
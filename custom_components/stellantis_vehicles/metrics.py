@@ -0,0 +1,187 @@
+import logging
+import time
+import aiohttp
+from collections import deque
+
+from .const import (
+    LATENCY_WINDOW,
+    LATENCY_MIN_SAMPLES,
+    ADAPTIVE_TIMEOUT_FACTOR,
+    ADAPTIVE_TIMEOUT_FLOOR
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def percentile(values, q):
+    """ Nearest-rank percentile of a sorted list. """
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values))) - 1))
+    return values[index]
+
+
+class LatencyTracker:
+    """ Sliding window of request durations per logical endpoint. """
+    def __init__(self, window=LATENCY_WINDOW, min_samples=LATENCY_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+
+    def record(self, endpoint, seconds):
+        if endpoint is None:
+            return
+        if endpoint not in self._samples:
+            self._samples[endpoint] = deque(maxlen=self.window)
+        self._samples[endpoint].append(seconds)
+
+    def get_percentile(self, endpoint, q):
+        """ Percentile q of the endpoint latency, None until there are enough samples. """
+        samples = self._samples.get(endpoint)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return percentile(sorted(samples), q)
+
+    def get_timeout(self, endpoint, ceiling):
+        """ p99 x factor, bounded by a floor and by the caller timeout. """
+        p99 = self.get_percentile(endpoint, 99)
+        if p99 is None:
+            return ceiling
+        return min(ceiling, max(ADAPTIVE_TIMEOUT_FLOOR, p99 * ADAPTIVE_TIMEOUT_FACTOR))
+
+    def as_dict(self):
+        result = {}
+        for endpoint, samples in self._samples.items():
+            values = sorted(samples)
+            result[endpoint] = {
+                "samples": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99)
+            }
+        return result
+
+
+class PhaseStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "avg": (self.total / self.count) if self.count else None,
+            "max": self.max,
+            "last": self.last
+        }
+
+
+class HttpMetrics:
+    """ Request phases timings and status counters per logical endpoint, fed by the aiohttp trace hooks. """
+    PHASES = ["dns", "connect", "ttfb"]
+
+    def __init__(self):
+        self._endpoints = {}
+
+    def get_endpoint(self, endpoint):
+        endpoint = endpoint or "other"
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = {
+                "phases": {phase: PhaseStats() for phase in self.PHASES},
+                "status": {},
+                "errors": {},
+                "reused_connections": 0
+            }
+        return self._endpoints[endpoint]
+
+    def record_phase(self, endpoint, phase, seconds):
+        self.get_endpoint(endpoint)["phases"][phase].add(seconds)
+
+    def record_status(self, endpoint, status):
+        counters = self.get_endpoint(endpoint)["status"]
+        counters[str(status)] = counters.get(str(status), 0) + 1
+
+    def record_error(self, endpoint, error):
+        counters = self.get_endpoint(endpoint)["errors"]
+        name = type(error).__name__
+        counters[name] = counters.get(name, 0) + 1
+
+    def record_reused_connection(self, endpoint):
+        self.get_endpoint(endpoint)["reused_connections"] += 1
+
+    def as_dict(self):
+        return {
+            endpoint: {
+                "phases": {phase: stats.as_dict() for phase, stats in data["phases"].items()},
+                "status": dict(data["status"]),
+                "errors": dict(data["errors"]),
+                "reused_connections": data["reused_connections"]
+            }
+            for endpoint, data in self._endpoints.items()
+        }
+
+
+def _trace_target(trace_config_ctx):
+    """ (metrics, endpoint) of a traced request, metrics is None for requests not sent by this integration. """
+    ctx = trace_config_ctx.trace_request_ctx
+    if not isinstance(ctx, dict):
+        return None, None
+    return ctx.get("metrics"), ctx.get("endpoint")
+
+async def _on_request_start(session, trace_config_ctx, params):
+    trace_config_ctx.start = time.monotonic()
+
+async def _on_dns_resolvehost_start(session, trace_config_ctx, params):
+    trace_config_ctx.dns_start = time.monotonic()
+
+async def _on_dns_resolvehost_end(session, trace_config_ctx, params):
+    metrics, endpoint = _trace_target(trace_config_ctx)
+    if metrics is not None:
+        metrics.record_phase(endpoint, "dns", time.monotonic() - trace_config_ctx.dns_start)
+
+async def _on_connection_create_start(session, trace_config_ctx, params):
+    trace_config_ctx.connect_start = time.monotonic()
+
+async def _on_connection_create_end(session, trace_config_ctx, params):
+    # aiohttp does not trace the TLS handshake on its own: connect includes TCP + TLS
+    metrics, endpoint = _trace_target(trace_config_ctx)
+    if metrics is not None:
+        metrics.record_phase(endpoint, "connect", time.monotonic() - trace_config_ctx.connect_start)
+
+async def _on_connection_reuseconn(session, trace_config_ctx, params):
+    metrics, endpoint = _trace_target(trace_config_ctx)
+    if metrics is not None:
+        metrics.record_reused_connection(endpoint)
+
+async def _on_request_end(session, trace_config_ctx, params):
+    # Fired when the response headers are received
+    metrics, endpoint = _trace_target(trace_config_ctx)
+    if metrics is not None:
+        metrics.record_phase(endpoint, "ttfb", time.monotonic() - trace_config_ctx.start)
+        metrics.record_status(endpoint, params.response.status)
+
+async def _on_request_exception(session, trace_config_ctx, params):
+    metrics, endpoint = _trace_target(trace_config_ctx)
+    if metrics is not None:
+        metrics.record_error(endpoint, params.exception)
+
+def create_trace_config():
+    """ aiohttp trace hooks feeding HttpMetrics, the target is passed with trace_request_ctx. """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_dns_resolvehost_start.append(_on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(_on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
@@ -0,0 +1,96 @@
+import io
+import os
+import re
+import hashlib
+
+from aiohttp import web
+from PIL import Image, ImageOps
+
+from homeassistant.components.http import HomeAssistantView
+
+from .const import (
+    DOMAIN,
+    PICTURE_VARIANTS,
+    PICTURE_CACHE_CONTROL
+)
+
+DATA_PICTURE_VIEW = f"{DOMAIN}_picture_view"
+
+PICTURE_FORMATS = {"webp": "WEBP", "png": "PNG"}
+PICTURE_NAME_PATTERN = re.compile(r"([A-Z0-9]{17})-([0-9a-f]{16})-(" + "|".join(PICTURE_VARIANTS) + r")(?:\.(webp|png))?")
+CUSTOMER_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def get_picture_hash(content):
+    """ Content address of a downloaded picture. """
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def get_picture_url(customer_id, vin, picture_hash, variant):
+    """ URL of a picture variant, the format (WebP or PNG) is negotiated by the view. """
+    return f"/api/{DOMAIN}/picture/{customer_id}/{vin}-{picture_hash}-{variant}"
+
+
+def get_picture_path(pictures_path, vin, picture_hash, variant, extension):
+    return os.path.join(pictures_path, f"{vin}-{picture_hash}-{variant}.{extension}")
+
+
+# Blocking helpers, run in the executor
+
+def has_picture_files(pictures_path, vin, picture_hash):
+    """ Every variant and format of a picture is saved. """
+    if not picture_hash:
+        return False
+    return all(
+        os.path.isfile(get_picture_path(pictures_path, vin, picture_hash, variant, extension))
+        for variant in PICTURE_VARIANTS for extension in PICTURE_FORMATS
+    )
+
+
+def save_picture_variants(content, pictures_path, vin, picture_hash):
+    """ Decode the downloaded picture, save every variant as WebP and PNG, remove the previous pictures of the vehicle. """
+    os.makedirs(pictures_path, exist_ok=True)
+    with Image.open(io.BytesIO(content)) as im:
+        im.load()
+        if im.mode not in ["RGB", "RGBA"]:
+            im = im.convert("RGBA")
+        for variant, size in PICTURE_VARIANTS.items():
+            # No upscaling, a small source stays small
+            side = min(size, max(im.size))
+            resized = ImageOps.pad(im, (side, side))
+            for extension, image_format in PICTURE_FORMATS.items():
+                path = get_picture_path(pictures_path, vin, picture_hash, variant, extension)
+                # Written aside then renamed, a half written file is never served
+                temp_path = f"{path}.tmp"
+                resized.save(temp_path, image_format, optimize=True)
+                os.replace(temp_path, path)
+    for name in os.listdir(pictures_path):
+        if name.startswith(vin) and f"-{picture_hash}-" not in name:
+            os.remove(os.path.join(pictures_path, name))
+
+
+class StellantisPictureView(HomeAssistantView):
+    """ Vehicle pictures. The URL holds the content hash, browsers keep them until the picture changes. """
+    url = f"/api/{DOMAIN}/picture/{{customer_id}}/{{filename}}"
+    name = f"api:{DOMAIN}:picture"
+    # Loaded by <img> and CSS backgrounds, which send no credentials (like /local)
+    requires_auth = False
+
+    def __init__(self, hass):
+        self._hass = hass
+
+    async def get(self, request, customer_id, filename):
+        match = PICTURE_NAME_PATTERN.fullmatch(filename)
+        if not match or not CUSTOMER_ID_PATTERN.fullmatch(customer_id):
+            return web.Response(status=404)
+        vin, picture_hash, variant, extension = match.groups()
+        if extension is None:
+            extension = "webp" if "image/webp" in request.headers.get("Accept", "") else "png"
+        path = get_picture_path(self._hass.config.path("www", DOMAIN, customer_id), vin, picture_hash, variant, extension)
+        if not await self._hass.async_add_executor_job(os.path.isfile, path):
+            return web.Response(status=404)
+        return web.FileResponse(path, headers={
+            "Cache-Control": PICTURE_CACHE_CONTROL,
+            "Content-Type": f"image/{extension}",
+            "Vary": "Accept"
+        })
@@ -0,0 +1,268 @@
+import logging
+import asyncio
+import math
+import statistics
+import time
+from collections import deque
+from datetime import datetime
+
+from homeassistant.core import HassJob
+from homeassistant.helpers.event import async_call_later
+
+from .utils import get_value_from_map
+
+from .const import (
+    SENSORS_DEFAULT,
+    BINARY_SENSORS_DEFAULT,
+    UPDATE_INTERVAL,
+    POLL_INTERVAL_ACTIVE,
+    POLL_INTERVAL_PARKED,
+    POLL_INTERVAL_DORMANT,
+    POLL_DORMANT_AFTER,
+    POLL_MAX_CONCURRENCY,
+    UPLOAD_CADENCE_WINDOW,
+    UPLOAD_CADENCE_MIN_SAMPLES,
+    UPLOAD_CADENCE_MIN,
+    UPLOAD_CADENCE_MAX,
+    UPLOAD_POLL_MARGIN,
+    UPLOAD_MAX_MISSES,
+    DOMAIN
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+POLLING_ACTIVE = "active"
+POLLING_DEFAULT = "default"
+POLLING_PARKED = "parked"
+POLLING_DORMANT = "dormant"
+
+# Server side timestamps of the status blocks (one per distinct updated_at_map)
+UPLOAD_TIMESTAMP_MAPS = []
+for _default in list(SENSORS_DEFAULT.values()) + list(BINARY_SENSORS_DEFAULT.values()):
+    if _default.get("updated_at_map") and _default["updated_at_map"] not in UPLOAD_TIMESTAMP_MAPS:
+        UPLOAD_TIMESTAMP_MAPS.append(_default["updated_at_map"])
+
+
+def get_upload_timestamp(data):
+    """ Latest server side timestamp of the status, as a UNIX timestamp. """
+    latest = None
+    for updated_at_map in UPLOAD_TIMESTAMP_MAPS:
+        value = get_value_from_map(data, updated_at_map)
+        if not isinstance(value, str):
+            continue
+        try:
+            timestamp = datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            continue
+        if latest is None or timestamp > latest:
+            latest = timestamp
+    return latest
+
+
+class UploadCadence:
+    """ Telemetry upload cadence of a vehicle, learnt from the distinct server side timestamps of its status.
+
+    The alignment only delays a poll, it never makes one sooner: it applies to the parked, dormant and default states
+    when the vehicle uploads at least as often as the interval (a parked vehicle uploading every 2 min, polled every 5).
+    The poll then lands just after an upload, within one cadence past the interval. Active vehicles, slower uploads
+    and a cadence not learnt yet (again after every polling state change) keep the plain interval grid.
+    """
+    def __init__(self):
+        self._intervals = deque(maxlen=UPLOAD_CADENCE_WINDOW)
+        self._last_upload = None
+        self._misses = 0
+
+    @property
+    def cadence(self):
+        if len(self._intervals) < UPLOAD_CADENCE_MIN_SAMPLES:
+            return None
+        return statistics.median(self._intervals)
+
+    def record(self, upload, now=None):
+        """ Record the upload timestamp seen by a poll. """
+        if upload is None:
+            return
+        now = now or time.time()
+        if self._last_upload is None or upload > self._last_upload:
+            if self._last_upload is not None and UPLOAD_CADENCE_MIN <= upload - self._last_upload <= UPLOAD_CADENCE_MAX:
+                self._intervals.append(upload - self._last_upload)
+            self._last_upload = upload
+            self._misses = 0
+        elif self.cadence and now > self._last_upload + self.cadence + UPLOAD_POLL_MARGIN:
+            # An upload was expected before this poll and did not come
+            self._misses += 1
+
+    def reset(self):
+        """ Forget the learnt cadence, the vehicle uploads at another pace in another polling state. """
+        self._intervals.clear()
+        self._misses = 0
+
+    def get_poll_delay(self, interval, now=None):
+        """ Seconds until the poll aligned just after an expected upload, None when the cadence is unknown, unreliable or slower than the interval.
+
+        Never sooner than the interval, and always after an upload still to come (not the last one).
+        """
+        cadence = self.cadence
+        if cadence is None or cadence > interval or self._misses >= UPLOAD_MAX_MISSES:
+            return None
+        now = now or time.time()
+        uploads = max(1, math.ceil((now + interval - UPLOAD_POLL_MARGIN - self._last_upload) / cadence))
+        return max(interval, self._last_upload + uploads * cadence + UPLOAD_POLL_MARGIN - now)
+
+    def as_dict(self):
+        return {
+            "cadence": round(self.cadence, 1) if self.cadence else None,
+            "samples": len(self._intervals),
+            "last_upload": datetime.fromtimestamp(self._last_upload).isoformat() if self._last_upload else None,
+            "misses": self._misses
+        }
+
+
+class PollingPolicy:
+    """ Poll interval of a vehicle picked from its state: fast while in use, slower when parked, slowest when nothing changes. """
+    def __init__(self):
+        self.state = POLLING_DEFAULT
+        self.interval = UPDATE_INTERVAL
+        self.uploads = UploadCadence()
+        self._last_change = time.monotonic()
+
+    def get_state(self, data, pending_action=False):
+        """ Polling state from the last vehicle status (the entities are updated after the poll). """
+        moving = get_value_from_map(data, BINARY_SENSORS_DEFAULT["moving"]["value_map"])
+        ignition = get_value_from_map(data, BINARY_SENSORS_DEFAULT["engine"]["value_map"])
+        charging = get_value_from_map(data, BINARY_SENSORS_DEFAULT["battery_charging"]["value_map"])
+        preconditioning = get_value_from_map(data, BINARY_SENSORS_DEFAULT["preconditioning"]["value_map"])
+        if pending_action or moving is True or ignition == "StartUp" or charging == "InProgress" or preconditioning == "Enabled":
+            return POLLING_ACTIVE
+
+        locked_states = get_value_from_map(data, BINARY_SENSORS_DEFAULT["doors"]["value_map"])
+        locked = isinstance(locked_states, list) and locked_states and "Unlocked" not in locked_states
+        if ignition == "Stop" and locked:
+            if time.monotonic() - self._last_change >= POLL_DORMANT_AFTER:
+                return POLLING_DORMANT
+            return POLLING_PARKED
+        return POLLING_DEFAULT
+
+    def update(self, data, data_changed, manual_interval=None, pending_action=False):
+        """ Interval for the next poll, the manual interval is the floor (and the active interval when set). """
+        if data_changed:
+            self._last_change = time.monotonic()
+        self.uploads.record(get_upload_timestamp(data or {}))
+        state = self.get_state(data or {}, pending_action)
+        intervals = {
+            POLLING_ACTIVE: POLL_INTERVAL_ACTIVE,
+            POLLING_DEFAULT: UPDATE_INTERVAL,
+            POLLING_PARKED: POLL_INTERVAL_PARKED,
+            POLLING_DORMANT: POLL_INTERVAL_DORMANT
+        }
+        interval = intervals[state]
+        if manual_interval and manual_interval > 0:
+            interval = manual_interval if state == POLLING_ACTIVE else max(interval, manual_interval)
+        if state != self.state or interval != self.interval:
+            _LOGGER.debug(f"Polling {self.state} ({self.interval}s) -> {state} ({interval}s)")
+        if state != self.state:
+            # The spacing of the polls bounds the observed upload gaps, the cadence is learnt again
+            self.uploads.reset()
+        self.state = state
+        self.interval = interval
+        return interval
+
+    def get_upload_poll_delay(self, interval):
+        """ Poll aligned on the uploads, only when not active: the vehicle in use is polled at the active interval. """
+        if self.state == POLLING_ACTIVE:
+            return None
+        return self.uploads.get_poll_delay(interval)
+
+    def as_dict(self):
+        return {
+            "state": self.state,
+            "interval": self.interval,
+            "unchanged_for": round(time.monotonic() - self._last_change),
+            "uploads": self.uploads.as_dict()
+        }
+
+
+class PollScheduler:
+    """ Account level poll timer: the polls of the vehicles are spread evenly over their interval, with bounded concurrency. """
+    def __init__(self, hass, max_concurrency=POLL_MAX_CONCURRENCY):
+        self._hass = hass
+        self._coordinators = []
+        self._due = {}
+        self._epoch = None
+        self._unsub = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._job = HassJob(self._async_fire, f"{DOMAIN} poll scheduler", cancel_on_shutdown=True)
+
+    def add(self, coordinator):
+        """ Drive the polls of a coordinator, the slots of every vehicle are spread again. """
+        if coordinator in self._coordinators:
+            return
+        now = self._hass.loop.time()
+        if self._epoch is None:
+            self._epoch = now
+        self._coordinators.append(coordinator)
+        for item in self._coordinators:
+            self._due[item] = self.get_next_due(item, now)
+        self._schedule()
+
+    def stop(self):
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._coordinators = []
+        self._due = {}
+        self._epoch = None
+
+    def get_slot(self, coordinator):
+        """ Phase of the vehicle in its interval, in [0, 1). """
+        return self._coordinators.index(coordinator) / len(self._coordinators)
+
+    def get_next_due(self, coordinator, now):
+        """ Just after the next expected upload of the vehicle, else next point of its grid (epoch + slot * interval + k * interval). """
+        interval = coordinator.poll_interval
+        upload_delay = coordinator.upload_poll_delay
+        if upload_delay is not None:
+            return now + upload_delay
+        offset = self._epoch + self.get_slot(coordinator) * interval
+        return offset + (math.floor((now - offset) / interval) + 1) * interval
+
+    def _schedule(self):
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        if not self._due:
+            return
+        delay = max(0, min(self._due.values()) - self._hass.loop.time())
+        self._unsub = async_call_later(self._hass, delay, self._job)
+
+    async def _async_fire(self, _now=None):
+        self._unsub = None
+        now = self._hass.loop.time()
+        for coordinator, due in list(self._due.items()):
+            if due <= now + 0.5:
+                # Not due again until polled and rescheduled with its new interval
+                self._due[coordinator] = math.inf
+                self._hass.async_create_background_task(self._async_poll(coordinator), f"{DOMAIN} poll {coordinator._vehicle['vin']}")
+        self._schedule()
+
+    async def _async_poll(self, coordinator):
+        try:
+            async with self._semaphore:
+                # Same rule as the coordinator timers: no listener, no poll
+                if coordinator._listeners:
+                    await coordinator.async_refresh()
+        finally:
+            if coordinator in self._due:
+                self._due[coordinator] = self.get_next_due(coordinator, self._hass.loop.time())
+                self._schedule()
+
+    def as_dict(self):
+        now = self._hass.loop.time()
+        return {
+            coordinator._vehicle["vin"]: {
+                "slot": round(self.get_slot(coordinator), 3),
+                "interval": coordinator.poll_interval,
+                "next_poll_in": round(self._due[coordinator] - now, 1) if self._due[coordinator] != math.inf else None
+            }
+            for coordinator in self._coordinators
+        }
@@ -0,0 +1,91 @@
+import logging
+import random
+import time
+
+from .utils import get_datetime
+from .exceptions import CircuitOpenException
+
+from .const import (
+    RETRY_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_BREAKER_THRESHOLD,
+    CIRCUIT_BREAKER_RECOVERY
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class RetryPolicy:
+    """ Bounded exponential backoff with full jitter. """
+    def __init__(self, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt):
+        """ Delay before the retry number attempt (starting from 1). """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """ Fail fast on an endpoint after sustained server errors, until a probe succeeds. """
+    def __init__(self, name, threshold=CIRCUIT_BREAKER_THRESHOLD, recovery=CIRCUIT_BREAKER_RECOVERY):
+        self.name = name
+        self.threshold = threshold
+        self.recovery = recovery
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self._opened_at = None
+        self._opened_date = None
+        self._probe_in_flight = False
+
+    def before_request(self):
+        """ Raise if the request must not be sent. """
+        if self.state == CIRCUIT_CLOSED:
+            return
+        if self.state == CIRCUIT_OPEN and (time.monotonic() - self._opened_at) >= self.recovery:
+            _LOGGER.debug(f"Circuit {self.name}: half open, send a probe request")
+            self.state = CIRCUIT_HALF_OPEN
+        if self.state == CIRCUIT_HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        self.total_rejected += 1
+        raise CircuitOpenException(f"Circuit {self.name} is open")
+
+    def record_success(self):
+        if self.state != CIRCUIT_CLOSED:
+            _LOGGER.debug(f"Circuit {self.name}: closed")
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.total_failures += 1
+        self._probe_in_flight = False
+        if self.state == CIRCUIT_HALF_OPEN or self.failures >= self.threshold:
+            if self.state != CIRCUIT_OPEN:
+                _LOGGER.warning(f"Circuit {self.name}: open for {self.recovery}s after {self.failures} failures")
+            self.state = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+            self._opened_date = get_datetime()
+
+    def release(self):
+        """ Request ended without a verdict on the server health (eg. auth error). """
+        self._probe_in_flight = False
+
+    def as_dict(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "total_failures": self.total_failures,
+            "total_rejected": self.total_rejected,
+            "opened_at": self._opened_date.isoformat() if self._opened_date else None
+        }
@@ -0,0 +1,84 @@
+import logging
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+
+_LOGGER = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_AUTH = 0
+PRIORITY_COMMAND = 1
+PRIORITY_STATUS = 2
+PRIORITY_BACKFILL = 3
+PRIORITY_TELEMETRY = 4
+PRIORITY_PICTURE = 5
+
+ENDPOINT_PRIORITIES = {
+    "token": PRIORITY_AUTH,
+    "oauth_code": PRIORITY_AUTH,
+    "otp_sms": PRIORITY_AUTH,
+    "mqtt_token": PRIORITY_AUTH,
+    "user_info": PRIORITY_AUTH,
+    "vehicles": PRIORITY_STATUS,
+    "status": PRIORITY_STATUS,
+    "trips": PRIORITY_BACKFILL,
+    "picture": PRIORITY_PICTURE,
+    "abrp": PRIORITY_TELEMETRY
+}
+
+
+class RequestScheduler:
+    """ Per account outbound request queue: bounded concurrency, served by priority then FIFO. """
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self._active = 0
+        self._queue = []
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self):
+        return sum(1 for _, _, future in self._queue if not future.done())
+
+    @property
+    def active(self):
+        return self._active
+
+    @asynccontextmanager
+    async def slot(self, priority=PRIORITY_STATUS):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority=PRIORITY_STATUS):
+        if self._active < self.max_concurrency and not self.queued:
+            self._active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), future))
+        _LOGGER.debug(f"Request queued with priority {priority} ({self.queued} waiting)")
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over right before the cancellation, give it back
+                self.release()
+            raise
+
+    def release(self):
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                # Hand the slot over, the active count does not change
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def as_dict(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queued": self.queued
+        }
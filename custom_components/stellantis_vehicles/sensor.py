@@ -2,7 +2,7 @@ import logging
 from time import ( strftime, gmtime )
 from copy import deepcopy
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import ( HomeAssistant, callback )
 from homeassistant.components.sensor import SensorEntityDescription
 from homeassistant.const import ( UnitOfLength, UnitOfSpeed, UnitOfEnergy, UnitOfVolume, UnitOfPower, PERCENTAGE )
 from homeassistant.components.sensor.const import ( SensorDeviceClass )
@@ -68,6 +68,16 @@ async def async_setup_entry(hass:HomeAssistant, entry, async_add_entities) -> No
         )
         entities.extend([StellantisTypeSensor(coordinator, description)])
 
+        if stellantis.api_budget.enabled:
+            description = SensorEntityDescription(
+                name = "api_budget_remaining",
+                key = "api_budget_remaining",
+                translation_key = "api_budget_remaining",
+                icon = "mdi:counter",
+                entity_category = EntityCategory.DIAGNOSTIC
+            )
+            entities.extend([StellantisApiBudgetSensor(coordinator, description)])
+
         if stellantis.remote_commands:
             description = SensorEntityDescription(
                 name = "command_status",
@@ -106,6 +116,26 @@ class StellantisTypeSensor(StellantisRestoreSensor):
     def coordinator_update(self):
         self._attr_native_value = self._coordinator.vehicle_type.lower()
 
+class StellantisApiBudgetSensor(StellantisRestoreSensor):
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        # The budget is per account: updated on every request, not only on the polls of this vehicle
+        self.async_on_remove(self._stellantis.api_budget.async_add_listener(self.budget_update))
+
+    @callback
+    def budget_update(self):
+        self.coordinator_update()
+        self.async_write_ha_state()
+
+    def coordinator_update(self):
+        budget = self._stellantis.api_budget
+        self._attr_native_value = budget.remaining
+        self._attr_extra_state_attributes = {
+            "daily_budget": budget.daily_budget,
+            "used": budget.used,
+            "poll_interval": self._coordinator.poll_interval
+        }
+
 class StellantisCommandStatusSensor(StellantisRestoreSensor):
     def coordinator_update(self):
         command_history = self._coordinator.command_history
@@ -260,6 +290,8 @@ class StellantisLastChargeSensor(StellantisRestoreSensor):
                 self._wait_next_update = False
 
             self._wait_next_update = True
+            # Finalized on the next update, which must come even if the status doesn't change
+            self._coordinator.request_entities_update()
 
         for attribute in attributes:
             if attribute in unit_of_measurement:
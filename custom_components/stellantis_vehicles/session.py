@@ -0,0 +1,55 @@
+import logging
+import aiohttp
+
+from homeassistant.core import ( HomeAssistant, callback )
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+
+from .codec import json_dumps
+from .metrics import create_trace_config
+from .const import (
+    DOMAIN,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_DNS_CACHE_TTL
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SESSION = f"{DOMAIN}_session"
+
+
+def get_shared_session(hass: HomeAssistant):
+    """ Shared HTTP session, one connection pool for every config entry and vehicle. """
+    session = hass.data.get(DATA_SESSION)
+    if session is not None and not session.closed:
+        return session
+
+    _LOGGER.debug("Creating shared HTTP session")
+    # Keep-alive outlives the active poll interval only: vehicles in use reuse their connection, the parked and
+    # dormant polls (minutes apart) open a new TCP+TLS connection instead of holding idle sockets (see const.py).
+    # Broken connections are dropped by aiohttp itself, healthy ones go back to the pool.
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL
+    )
+    session = aiohttp.ClientSession(connector=connector, json_serialize=json_dumps, trace_configs=[create_trace_config()])
+    hass.data[DATA_SESSION] = session
+
+    @callback
+    def _async_close_session(event):
+        hass.async_create_task(session.close())
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+    return session
+
+
+async def async_close_shared_session(hass: HomeAssistant):
+    """ Close the shared HTTP session (when no entry uses it anymore). """
+    session = hass.data.pop(DATA_SESSION, None)
+    if session is None or session.closed:
+        return
+    _LOGGER.debug("Closing shared HTTP session")
+    await session.close()
@@ -0,0 +1,64 @@
+import logging
+import time
+
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    SNAPSHOT_SAVE_DELAY,
+    SNAPSHOT_MAX_AGE
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+
+class VehicleSnapshots:
+    """ Last status of the vehicles of an account, the coordinators start from it after a restart.
+
+    One snapshot per VIN: the status payload without the HAL links, the JSON native values of the sensors and the last trip.
+    """
+    def __init__(self, hass):
+        self._hass = hass
+        self._snapshots = {}
+        self._pending = {}
+        self._store = None
+
+    async def async_load(self, customer_id):
+        self._store = Store(self._hass, STORAGE_VERSION, f"{DOMAIN}/{customer_id}_snapshot")
+        data = await self._store.async_load()
+        if data:
+            self._snapshots = data.get("vehicles", {})
+
+    def get(self, vin):
+        """ Snapshot of a vehicle, None when missing or older than SNAPSHOT_MAX_AGE. """
+        snapshot = self._snapshots.get(vin)
+        if not snapshot or time.time() - snapshot.get("saved_at", 0) > SNAPSHOT_MAX_AGE:
+            return None
+        return snapshot
+
+    def update(self, vin, data, sensors, last_trip):
+        """ Replace the snapshot of a vehicle, written to disk after SNAPSHOT_SAVE_DELAY. """
+        if not data:
+            return
+        # Compacted at write time: the entities fill the sensors after the update
+        self._pending[vin] = (time.time(), data, sensors, last_trip)
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    async def async_flush(self):
+        """ Write the pending snapshots now (unload), the delayed save is cancelled. """
+        if self._store is not None and self._pending:
+            await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self):
+        for vin, (saved_at, data, sensors, last_trip) in self._pending.items():
+            self._snapshots[vin] = {
+                "saved_at": saved_at,
+                "data": {key: value for key, value in data.items() if not key.startswith("_")},
+                "sensors": {key: value for key, value in sensors.items() if value is None or isinstance(value, (str, int, float, bool))},
+                "last_trip": last_trip
+            }
+        self._pending = {}
+        return {"vehicles": self._snapshots}
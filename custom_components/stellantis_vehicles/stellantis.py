@@ -1,29 +1,40 @@
 import logging
 import aiohttp
 import base64
-from PIL import Image, ImageOps
 import os
-from urllib.request import urlopen
 from copy import deepcopy
 import paho.mqtt.client as mqtt
-import json
 from uuid import uuid4
 import asyncio
+import time
 from datetime import ( datetime, timedelta )
+from functools import partial
 import ssl
 import socket
 import random
 
 from homeassistant.core import ( HomeAssistant, HassJob)
-from homeassistant.helpers import translation
+from homeassistant.helpers import ( translation, device_registry )
 from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.components import persistent_notification
 from homeassistant.helpers.event import async_track_point_in_time
 
 from .base import StellantisVehicleCoordinator
+from .session import get_shared_session
 from .otp.otp import Otp, save_otp, load_otp, ConfigException
-from .utils import ( get_datetime, rate_limit, SensitiveDataFilter, replace_string_placeholders )
-from .exceptions import ( ComunicationError, RateLimitException )
+from .utils import ( get_datetime, rate_limit, SensitiveDataFilter, SingleFlight, replace_string_placeholders, compile_template, TEMPLATE_MISSING )
+from .resilience import ( RetryPolicy, CircuitBreaker, CIRCUIT_OPEN )
+from .cache import HttpCache
+from .metrics import ( LatencyTracker, HttpMetrics )
+from .transport import ( create_transport, HttpRecorder, HttpReplayer )
+from .scheduler import ( RequestScheduler, ENDPOINT_PRIORITIES, PRIORITY_STATUS )
+from .polling import PollScheduler
+from .budget import ApiBudget
+from .pictures import ( get_picture_hash, get_picture_url, has_picture_files, save_picture_variants )
+from .snapshot import VehicleSnapshots
+from .catalog import ( VehicleCatalog, catalog_changed, PICTURE_FIELDS )
+from .codec import ( json_loads, json_dumps, read_body, decode_body )
+from .exceptions import ( ComunicationError, RateLimitException, ServiceUnavailableError )
 
 from .const import (
     DOMAIN,
@@ -31,6 +42,8 @@ from .const import (
     FIELD_COUNTRY_CODE,
     FIELD_REMOTE_COMMANDS,
     FIELD_NOTIFICATIONS,
+    FIELD_DAILY_API_BUDGET,
+    FIELD_MAX_CONCURRENT_REQUESTS,
     MOBILE_APPS,
     OAUTH_AUTHORIZE_URL,
     OAUTH_TOKEN_URL,
@@ -48,7 +61,9 @@ from .const import (
     GET_MQTT_TOKEN_URL,
     MQTT_SERVER,
     MQTT_PORT,
+    MQTT_TLS,
     MQTT_KEEP_ALIVE_S,
+    MQTT_CONNECT_TIMEOUT,
     MQTT_QOS,
     MQTT_RESP_TOPIC,
     MQTT_EVENT_TOPIC,
@@ -60,6 +75,14 @@ from .const import (
     OTP_FILENAME,
     ABRP_URL,
     ABRP_API_KEY,
+    STATUS_FRESHNESS_WINDOW,
+    CATALOG_CACHE_TTL,
+    STARTUP_MAX_CONCURRENCY,
+    PICTURE_MAX_SIZE,
+    PICTURE_DOWNLOAD_TIMEOUT,
+    HTTP_MAX_CONCURRENT_REQUESTS,
+    HTTP_MAX_BODY_SIZE,
+    HEDGE_STATUS_REQUESTS,
     TRANSLATION_PLACEHOLDERS
 )
 
@@ -119,20 +142,28 @@ class StellantisBase:
     def __init__(self, hass: HomeAssistant) -> None:
         self._hass = hass
         self._config = {}
+        self._rendered_dicts = {}
         self._session = None
+        self._retry_policy = RetryPolicy()
+        self._http_cache = HttpCache()
+        self._scheduler = RequestScheduler(HTTP_MAX_CONCURRENT_REQUESTS)
+        self._latency = LatencyTracker()
+        self._http_metrics = HttpMetrics()
+        self._budget = ApiBudget(hass)
+        self._circuit_breakers = {}
         self.otp = None
 
         self.logger_filter = SensitiveDataFilter()
         _LOGGER.addFilter(self.logger_filter)
 
+        self._transport = create_transport(hass, self.logger_filter)
+
     def start_session(self):
-        if not self._session:
-            self._session = aiohttp.ClientSession()
+        if not self._session or self._session.closed:
+            self._session = get_shared_session(self._hass)
 
     async def close_session(self):
-        if not self._session or self._session.closed:
-            return
-        await self._session.close()
+        # The pool is shared with the other entries, just release it
         self._session = None
 
     def set_mobile_app(self, mobile_app, country_code):
@@ -149,6 +180,7 @@ class StellantisBase:
     def save_config(self, data):
         for key in data:
             self._config[key] = data[key]
+            self.invalidate_rendered_dicts(key)
             if key == FIELD_MOBILE_APP and FIELD_COUNTRY_CODE in self._config:
                 self.set_mobile_app(data[key], self._config[FIELD_COUNTRY_CODE])
             elif key == FIELD_COUNTRY_CODE and FIELD_MOBILE_APP in self._config:
@@ -167,28 +199,44 @@ class StellantisBase:
         self.save_config({FIELD_REMOTE_COMMANDS: False})
         self.update_stored_config(FIELD_REMOTE_COMMANDS, False)
 
+    def get_placeholder_value(self, name, vehicle=None):
+        if vehicle and name in vehicle:
+            return vehicle[name]
+        key, _, subkey = name.partition("|")
+        if key not in self._config:
+            return TEMPLATE_MISSING
+        value = self._config[key]
+        if subkey:
+            if isinstance(value, dict) and subkey in value:
+                return value[subkey]
+            return TEMPLATE_MISSING
+        if isinstance(value, dict):
+            return TEMPLATE_MISSING
+        return value
+
     def replace_placeholders(self, string, vehicle=None):
-        if vehicle is None:
-            vehicle = []
-        for key in vehicle:
-            string = string.replace("{#" + key + "#}", str(vehicle[key]))
-        for key, value in self._config.items():
-            if isinstance(value, dict):
-                for subkey, subvalue in value.items():
-                    string = string.replace("{#" + key + "|" + subkey + "#}", str(subvalue))
-            else:
-                string = string.replace("{#" + key + "#}", str(value))
-        return string
+        return compile_template(string).render(lambda name: self.get_placeholder_value(name, vehicle))
+
+    def invalidate_rendered_dicts(self, key):
+        for cache_key in [cache_key for cache_key, (keys, _) in self._rendered_dicts.items() if key in keys]:
+            del self._rendered_dicts[cache_key]
 
     def apply_dict_params(self, headers):
-        new_headers = {}
-        for key in headers:
-            new_headers[key] = self.replace_placeholders(headers[key])
-        return new_headers
+        # Rendered dicts are cached until save_config changes one of the referenced keys
+        cache_key = tuple(headers.items())
+        cached = self._rendered_dicts.get(cache_key)
+        if cached is None:
+            keys = set()
+            rendered = {}
+            for key in headers:
+                template = compile_template(headers[key])
+                keys.update(template.keys)
+                rendered[key] = template.render(self.get_placeholder_value)
+            cached = (frozenset(keys), rendered)
+            self._rendered_dicts[cache_key] = cached
+        return dict(cached[1])
 
     def apply_query_params(self, url, params, vehicle=None):
-        if vehicle is None:
-            vehicle = []
         query_params = []
         for key in params:
             value = params[key]
@@ -196,65 +244,217 @@ class StellantisBase:
         query_params = '&'.join(query_params)
         return self.replace_placeholders(f"{url}?{query_params}", vehicle)
 
-    async def make_http_request(self, url, method='GET', headers=None, params=None, json_data=None, data=None, timeout=60):
-        _LOGGER.debug("---------- START make_http_request")
+    def get_circuit_breaker(self, endpoint):
+        if endpoint is None:
+            return None
+        if endpoint not in self._circuit_breakers:
+            self._circuit_breakers[endpoint] = CircuitBreaker(endpoint)
+        return self._circuit_breakers[endpoint]
+
+    @property
+    def circuit_breakers_state(self):
+        return {endpoint: breaker.as_dict() for endpoint, breaker in self._circuit_breakers.items()}
+
+    @property
+    def request_scheduler_state(self):
+        return self._scheduler.as_dict()
+
+    @property
+    def http_metrics_state(self):
+        metrics = self._http_metrics.as_dict()
+        for endpoint, latency in self._latency.as_dict().items():
+            metrics.setdefault(endpoint, {})["total"] = latency
+        return metrics
+
+    async def make_http_request(self, url, method='GET', headers=None, params=None, json_data=None, data=None, timeout=60, endpoint=None, cache_key=None, cache_ttl=None, priority=None, hedge=False, raw=False):
+        if cache_key is not None and cache_ttl:
+            cached = self._http_cache.get_fresh(cache_key, cache_ttl)
+            if cached is not None:
+                return cached
+        if priority is None:
+            priority = ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_STATUS)
+        breaker = self.get_circuit_breaker(endpoint)
+        # Only idempotent requests are retried
+        attempts = self._retry_policy.attempts if method == "GET" else 1
+        attempt = 1
+        while True:
+            self._budget.check(endpoint)
+            if breaker:
+                breaker.before_request()
+            # The caller timeout is the ceiling, the endpoint latency tightens it once known
+            request_timeout = self._latency.get_timeout(endpoint, timeout)
+            request_args = (url, method, headers, params, json_data, data, request_timeout, cache_key, endpoint)
+            try:
+                if hedge:
+                    result = await self.send_hedged_http_request(priority, endpoint, *request_args)
+                else:
+                    result = await self.send_scheduled_http_request(priority, endpoint, *request_args, raw=raw)
+            except ServiceUnavailableError:
+                if breaker:
+                    breaker.record_failure()
+                if attempt >= attempts or (breaker and breaker.state == CIRCUIT_OPEN):
+                    raise
+                delay = self._retry_policy.get_delay(attempt)
+                _LOGGER.debug(f"Retry {method} request in {delay:.1f}s (attempt {attempt + 1}/{attempts})")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                if breaker:
+                    breaker.release()
+                raise
+            if breaker:
+                breaker.record_success()
+            return result
+
+    async def send_scheduled_http_request(self, priority, endpoint, *args, **kwargs):
+        async with self._scheduler.slot(priority):
+            start = time.monotonic()
+            try:
+                result = await self.send_http_request(*args, **kwargs)
+            except Exception:
+                # Cancelled requests (hedge losers) are not recorded
+                self._latency.record(endpoint, time.monotonic() - start)
+                raise
+            self._latency.record(endpoint, time.monotonic() - start)
+            return result
+
+    async def send_hedged_http_request(self, priority, endpoint, *args):
+        # Read-only requests only: a second request is sent when the first one exceeds p95
+        # The attempts don't touch the cache, only the winner updates it (a second store would mark the status unchanged)
+        hedge_delay = self._latency.get_percentile(endpoint, 95)
+        tasks = [asyncio.ensure_future(self.send_scheduled_http_request(priority, endpoint, *args, defer_cache=True))]
+        try:
+            if hedge_delay is None:
+                return (await tasks[0])()
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                _LOGGER.debug(f"Hedged {endpoint} request after {hedge_delay:.2f}s")
+                tasks.append(asyncio.ensure_future(self.send_scheduled_http_request(priority, endpoint, *args, defer_cache=True)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def set_transport(self, transport):
+        """ Live (None), HttpRecorder or HttpReplayer. """
+        self._transport = transport
+
+    async def fetch_http_response(self, url, method, headers, params, json_data, data, timeout, endpoint, max_size=HTTP_MAX_BODY_SIZE):
+        if isinstance(self._transport, HttpReplayer):
+            return await self._transport.replay(method, endpoint, url)
+        self._budget.record(endpoint)
         self.start_session()
+        start = time.monotonic()
+        _timeout = aiohttp.ClientTimeout(total=timeout)
+        trace_ctx = {"metrics": self._http_metrics, "endpoint": endpoint}
+        async with self._session.request(method, url, params=params, json=json_data, data=data, headers=headers, timeout=_timeout, trace_request_ctx=trace_ctx) as resp:
+            # Body is read once as bytes and decoded once
+            body = b"" if resp.status == 304 else await read_body(resp, max_size)
+            status, response_headers = resp.status, resp.headers
+        if isinstance(self._transport, HttpRecorder):
+            request = {"headers": headers, "params": params, "json": json_data, "data": data}
+            await self._transport.record(method, endpoint, url, request, status, response_headers, body, time.monotonic() - start)
+        return status, response_headers, body
+
+    def update_http_cache(self, cache_key, status, result, body, headers):
+        """ Cache side effect of a response, the cached result is returned when unchanged. """
+        if status == 304:
+            return self._http_cache.not_modified(cache_key)
+        if str(status).startswith("20"):
+            return self._http_cache.store(cache_key, result, body, headers)
+        return result
+
+    async def send_http_request(self, url, method='GET', headers=None, params=None, json_data=None, data=None, timeout=60, cache_key=None, endpoint=None, defer_cache=False, raw=False):
+        """ Send a request, with defer_cache the cache update is returned as a callable giving the result, with raw the body bytes. """
+        _LOGGER.debug("---------- START make_http_request")
+        # Conditional request if the previous response had validators
+        request_headers = headers
+        if cache_key is not None:
+            validators = self._http_cache.get_validators(cache_key)
+            if validators:
+                request_headers = {**(headers or {}), **validators}
         try:
-            _timeout = aiohttp.ClientTimeout(total=timeout)
-            async with self._session.request(method, url, params=params, json=json_data, data=data, headers=headers, timeout=_timeout) as resp:
-                result = {}
-                error = None
-                if method != "DELETE" and (await resp.text()):
-                    result = await resp.json()
-                if not str(resp.status).startswith("20"):
-                    _LOGGER.debug(f"{method} request error {str(resp.status)}: {resp.url}")
-                    _LOGGER.debug(headers)
-                    _LOGGER.debug(params)
-                    _LOGGER.debug(json_data)
-                    _LOGGER.debug(data)
-                    _LOGGER.debug(result)
-                    if "httpMessage" in result and "moreInformation" in result:
-                        error = result["httpMessage"] + " - " + result["moreInformation"]
-                    elif "error" in result and "error_description" in result:
-                        error = result["error"] + " - " + result["error_description"]
-                    elif "message" in result and "code" in result:
-                        error = result["message"] + " - " + str(result["code"])
-
-                if str(resp.status) == "404" and str(result["code"]) == "40400":
-                    # Not Found: We didn't find the status for this vehicle. - 40400
-                    _LOGGER.warning(error)
-                    result = {}
-                elif str(resp.status) == "500" and result.get("code", None) == "50000":
-                    # Connection module replaced (https://github.com/andreadegiovine/homeassistant-stellantis-vehicles/issues/388)
-                    raise ConfigEntryAuthFailed(error)
-                elif str(resp.status) == "400" and result.get("error", None) == "invalid_grant":
-                    # Token expiration
-                    raise ConfigEntryAuthFailed(error)
-                elif str(resp.status) == "401":
-                    # Oauth token seem expired, refresh request blocked by server/connection error
-                    raise ComunicationError(error)
-                elif str(resp.status).startswith("50"):
-                    # Internal error
-                    raise ComunicationError(error)
-                if error is not None:
-                    # Generic error
-                    raise Exception(error)
+            # Raw requests are the picture downloads
+            max_size = PICTURE_MAX_SIZE if raw else HTTP_MAX_BODY_SIZE
+            status, response_headers, body = await self.fetch_http_response(url, method, request_headers, params, json_data, data, timeout, endpoint, max_size)
+            if raw:
+                _LOGGER.debug("---------- END make_http_request")
+                if str(status).startswith("50"):
+                    raise ServiceUnavailableError(f"{method} request error {status}")
+                if status != 200:
+                    raise ComunicationError(f"{method} request error {status}")
+                return body
+            if cache_key is not None and status == 304:
                 _LOGGER.debug("---------- END make_http_request")
-                return result
+                cache_update = partial(self.update_http_cache, cache_key, status, None, body, response_headers)
+                return cache_update if defer_cache else cache_update()
+            result = {}
+            error = None
+            if method != "DELETE":
+                result = decode_body(body, status)
+            if not str(status).startswith("20"):
+                _LOGGER.debug(f"{method} request error {str(status)}: {url}")
+                _LOGGER.debug(headers)
+                _LOGGER.debug(params)
+                _LOGGER.debug(json_data)
+                _LOGGER.debug(data)
+                _LOGGER.debug(result)
+                if "httpMessage" in result and "moreInformation" in result:
+                    error = result["httpMessage"] + " - " + result["moreInformation"]
+                elif "error" in result and "error_description" in result:
+                    error = result["error"] + " - " + result["error_description"]
+                elif "message" in result and "code" in result:
+                    error = result["message"] + " - " + str(result["code"])
+
+            if str(status) == "404" and str(result.get("code", None)) == "40400":
+                # Not Found: We didn't find the status for this vehicle. - 40400
+                _LOGGER.warning(error)
+                result = {}
+                if cache_key is not None:
+                    # The cached status no longer applies, the next one is a change
+                    self._http_cache.invalidate(cache_key)
+            elif str(status) == "500" and result.get("code", None) == "50000":
+                # Connection module replaced (https://github.com/andreadegiovine/homeassistant-stellantis-vehicles/issues/388)
+                raise ConfigEntryAuthFailed(error)
+            elif str(status) == "400" and result.get("error", None) == "invalid_grant":
+                # Token expiration
+                raise ConfigEntryAuthFailed(error)
+            elif str(status) == "401":
+                # Oauth token seem expired, refresh request blocked by server/connection error
+                raise ComunicationError(error)
+            elif str(status).startswith("50"):
+                # Internal error
+                raise ServiceUnavailableError(error)
+            if error is not None:
+                # Generic error
+                raise Exception(error)
+            _LOGGER.debug("---------- END make_http_request")
+            if cache_key is None:
+                cache_update = lambda: result
+            else:
+                cache_update = partial(self.update_http_cache, cache_key, status, result, body, response_headers)
+            return cache_update if defer_cache else cache_update()
         except asyncio.TimeoutError as e:
-            await self.close_session()
             _LOGGER.warning(f"Error: {e}")
             _LOGGER.debug("---------- END make_http_request")
             # Connection error
-            raise ComunicationError("Request timeout")
+            raise ServiceUnavailableError("Request timeout")
         except aiohttp.client_exceptions.ClientError as e:
-            await self.close_session()
             _LOGGER.warning(f"Error: {e}")
             _LOGGER.debug("---------- END make_http_request")
             # Connection error
-            raise ComunicationError(e)
+            raise ServiceUnavailableError(e)
         except Exception as e:
-            await self.close_session()
             _LOGGER.warning(f"Error: {e}")
             _LOGGER.debug("---------- END make_http_request")
             raise
@@ -294,7 +494,7 @@ class StellantisOauth(StellantisBase):
 
     async def get_oauth_code(self, email, password):
         _LOGGER.debug("---------- START get_oauth_code")
-        oauth_code_request = await self.make_http_request(OAUTH_CODE_URL, 'POST', None, None, {"url": self.get_oauth_url(), "email": email, "password": password}, None, 300)
+        oauth_code_request = await self.make_http_request(OAUTH_CODE_URL, 'POST', None, None, {"url": self.get_oauth_url(), "email": email, "password": password}, None, 300, endpoint="oauth_code")
         if "code" in oauth_code_request:
             self.logger_filter.add_custom_value(oauth_code_request["code"])
         _LOGGER.debug(oauth_code_request)
@@ -305,7 +505,7 @@ class StellantisOauth(StellantisBase):
         _LOGGER.debug("---------- START get_access_token")
         url = self.apply_query_params(OAUTH_TOKEN_URL, OAUTH_GET_TOKEN_QUERY_PARAMS)
         headers = self.apply_dict_params(OAUTH_TOKEN_HEADERS)
-        token_request = await self.make_http_request(url, 'POST', headers)
+        token_request = await self.make_http_request(url, 'POST', headers, endpoint="token")
         if "access_token" in token_request:
             self.logger_filter.add_custom_value(token_request["access_token"])
         if "refresh_token" in token_request:
@@ -323,7 +523,7 @@ class StellantisOauth(StellantisBase):
         url = self.apply_query_params(GET_USER_INFO_URL, CLIENT_ID_QUERY_PARAMS)
         headers = self.apply_dict_params(GET_OTP_HEADERS)
         headers["x-transaction-id"] = "1234"
-        user_request = await self.make_http_request(url, 'GET', headers)
+        user_request = await self.make_http_request(url, 'GET', headers, endpoint="user_info", cache_key="user_info", cache_ttl=CATALOG_CACHE_TTL)
         if "customer" in user_request[0]:
             self.logger_filter.add_custom_value(user_request[0]["customer"])
         if "vehicle" in user_request[0]:
@@ -353,7 +553,7 @@ class StellantisOauth(StellantisBase):
         _LOGGER.debug("---------- START get_otp_sms")
         url = self.apply_query_params(GET_OTP_URL, CLIENT_ID_QUERY_PARAMS)
         headers = self.apply_dict_params(GET_OTP_HEADERS)
-        sms_request = await self.make_http_request(url, 'POST', headers)
+        sms_request = await self.make_http_request(url, 'POST', headers, endpoint="otp_sms")
         _LOGGER.debug(url)
         _LOGGER.debug(headers)
         _LOGGER.debug(sms_request)
@@ -366,7 +566,7 @@ class StellantisOauth(StellantisBase):
         headers = self.apply_dict_params(GET_OTP_HEADERS)
         try:
             otp_code = await self.get_otp_code()
-            token_request = await self.make_http_request(url, 'POST', headers, None, {"grant_type": "password", "password": otp_code})
+            token_request = await self.make_http_request(url, 'POST', headers, None, {"grant_type": "password", "password": otp_code}, endpoint="mqtt_token")
             if "access_token" in token_request:
                 self.logger_filter.add_custom_value(token_request["access_token"])
             if "refresh_token" in token_request:
@@ -422,6 +622,14 @@ class StellantisVehicles(StellantisOauth):
         self._vehicles = []
         self._mqtt = None
         self._mqtt_last_request = None
+        self._mqtt_connect_started = None
+        self._setup_tasks = []
+        self._status_requests = SingleFlight(STATUS_FRESHNESS_WINDOW)
+        self._status_changed = {}
+        self._poll_scheduler = PollScheduler(hass)
+        self._snapshots = VehicleSnapshots(hass)
+        self._catalog = VehicleCatalog(hass)
+        self._vehicles_from_catalog = False
 
         self._oauth_token_scheduled = None
         self._mqtt_token_scheduled = None
@@ -429,6 +637,35 @@ class StellantisVehicles(StellantisOauth):
     def set_entry(self, entry):
         self._entry = entry
         self.logger_filter.add_entry_values(self._config)
+        self._budget.daily_budget = entry.data.get(FIELD_DAILY_API_BUDGET, 0)
+        self._scheduler.max_concurrency = entry.data.get(FIELD_MAX_CONCURRENT_REQUESTS, HTTP_MAX_CONCURRENT_REQUESTS)
+
+    async def async_load_budget(self):
+        if self._budget.enabled:
+            await self._budget.async_load(self.get_config("customer_id"))
+
+    async def async_load_catalog(self):
+        await self._catalog.async_load(self.get_config("customer_id"))
+
+    async def async_load_snapshots(self):
+        await self._snapshots.async_load(self.get_config("customer_id"))
+
+    async def async_flush_stores(self):
+        """ Write the delayed saves before unloading, a pending write would recreate the files of a removed entry. """
+        await self._snapshots.async_flush()
+        await self._budget.async_flush()
+
+    def save_snapshot(self, coordinator):
+        self._snapshots.update(coordinator._vehicle["vin"], coordinator._data, coordinator._sensors, coordinator._last_trip)
+
+    @property
+    def api_budget(self):
+        return self._budget
+
+    def get_budget_interval(self, coordinator):
+        """ Shortest poll interval of the vehicle allowed by the daily API budget. """
+        states = [item._polling.state for item in self._coordinator_dict.values()]
+        return self._budget.get_min_interval(coordinator._polling.state, states)
 
     def update_stored_config(self, config, value):
         data = self._entry.data
@@ -475,28 +712,97 @@ class StellantisVehicles(StellantisOauth):
         if vin in self._coordinator_dict:
             return self._coordinator_dict[vin]
         translations = await translation.async_get_translations(self._hass, self._hass.config.language, "entity", {DOMAIN})
+        # Platforms are set up concurrently, another one may have created it meanwhile
+        if vin in self._coordinator_dict:
+            return self._coordinator_dict[vin]
         coordinator = StellantisVehicleCoordinator(self._hass, self._config, vehicle, self, translations)
+        coordinator.restore_snapshot(self._snapshots.get(vin))
         self._coordinator_dict[vin] = coordinator
+        self._poll_scheduler.add(coordinator)
         return coordinator
 
-    async def resize_and_save_picture(self, url, vin):
-        public_path = self._hass.config.path("www")
+    async def async_first_refresh(self, vehicles):
+        """ First refresh of the vehicles, a few at a time. Vehicles restored from a snapshot are refreshed in background. """
+        semaphore = asyncio.Semaphore(STARTUP_MAX_CONCURRENCY)
+        async def background_refresh(coordinator):
+            async with semaphore:
+                await coordinator.async_refresh()
+        async def first_refresh(vehicle):
+            coordinator = await self.async_get_coordinator(vehicle)
+            if coordinator.warm_started:
+                self.async_create_setup_task(background_refresh(coordinator), f"refresh {vehicle['vin']}")
+                return
+            async with semaphore:
+                await coordinator.async_config_entry_first_refresh()
+        results = await asyncio.gather(*[first_refresh(vehicle) for vehicle in vehicles], return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    def async_create_setup_task(self, target, name):
+        """ Optional setup work (MQTT, pictures) run in background, entities don't wait for it. """
+        task = self._hass.async_create_background_task(target, f"{DOMAIN} {name}")
+        self._setup_tasks.append(task)
+        return task
+
+    def cancel_setup_tasks(self):
+        for task in self._setup_tasks:
+            task.cancel()
+        self._setup_tasks = []
+
+    def stop_polling(self):
+        self._poll_scheduler.stop()
+        for coordinator in self._coordinator_dict.values():
+            coordinator.cancel_command_verifications()
+
+    @property
+    def poll_scheduler_state(self):
+        return self._poll_scheduler.as_dict()
+
+    async def cache_picture(self, vehicle):
+        """ Download the picture of a vehicle and save its variants, only when the source URL changed or files are missing. """
         customer_id = self.get_config("customer_id")
-        if not os.path.isdir(public_path):
-            _LOGGER.warning("Folder \"www\" not found in configuration folder")
-            return url
-        entry_path = f"{public_path}/{DOMAIN}/{customer_id}"
-        if not os.path.isdir(entry_path):
-            os.makedirs(entry_path, exist_ok=True)
-        image_path = f"{entry_path}/{vin}.png"
-        image_url = image_path.replace(public_path, "/local")
-        if os.path.isfile(image_path):
-            return image_url
-        image = await self._hass.async_add_executor_job(urlopen, url)
-        with Image.open(image) as im:
-            im = ImageOps.pad(im, (400, 400))
-        await self._hass.async_add_executor_job(im.save, image_path)
-        return image_url
+        vin = vehicle["vin"]
+        url = vehicle["picture_url"]
+        pictures_path = self._hass.config.path("www", DOMAIN, customer_id)
+        # Folder checks and image work run in the executor, only the download runs on the event loop
+        saved = await self._hass.async_add_executor_job(has_picture_files, pictures_path, vin, vehicle.get("picture_hash"))
+        if saved and vehicle.get("picture_source") == url:
+            return False
+        content = await self.download_picture(url)
+        picture_hash = get_picture_hash(content)
+        if not saved or picture_hash != vehicle.get("picture_hash"):
+            await self._hass.async_add_executor_job(save_picture_variants, content, pictures_path, vin, picture_hash)
+        vehicle["picture_source"] = url
+        vehicle["picture_hash"] = picture_hash
+        vehicle["picture"] = get_picture_url(customer_id, vin, picture_hash, "thumb")
+        vehicle["picture_full"] = get_picture_url(customer_id, vin, picture_hash, "full")
+        return True
+
+    async def download_picture(self, url):
+        """ Picture bytes, bounded by PICTURE_MAX_SIZE, queued behind every other request of the account. """
+        return await self.make_http_request(url, 'GET', timeout=PICTURE_DOWNLOAD_TIMEOUT, endpoint="picture", raw=True)
+
+    async def async_load_pictures(self):
+        """ Cache the pictures of the vehicles, a few at a time. """
+        _LOGGER.debug("---------- START async_load_pictures")
+        semaphore = asyncio.Semaphore(STARTUP_MAX_CONCURRENCY)
+        async def load_picture(vehicle):
+            async with semaphore:
+                try:
+                    if not await self.cache_picture(vehicle):
+                        return False
+                except Exception as e:
+                    _LOGGER.warning(str(e))
+                    return False
+            coordinator = self._coordinator_dict.get(vehicle["vin"])
+            if coordinator:
+                coordinator.async_update_listeners()
+            return True
+        results = await asyncio.gather(*[load_picture(vehicle) for vehicle in self._vehicles if vehicle.get("picture_url")])
+        if any(results):
+            await self._catalog.async_save_pictures(self._vehicles)
+        _LOGGER.debug("---------- END async_load_pictures")
 
     def reset_scheduled_tokens(self):
         self.reset_scheduled_oauth_token()
@@ -512,11 +818,6 @@ class StellantisVehicles(StellantisOauth):
             self._mqtt_token_scheduled()
             self._mqtt_token_scheduled = None
 
-    async def scheduled_tokens_refresh(self):
-        self.reset_scheduled_tokens()
-        await self.scheduled_oauth_token_refresh()
-        await self.scheduled_mqtt_token_refresh()
-
     async def scheduled_oauth_token_refresh(self, now=None):
         _LOGGER.debug("---------- START scheduled_oauth_token_refresh")
         def get_next_run():
@@ -545,7 +846,7 @@ class StellantisVehicles(StellantisOauth):
         _LOGGER.debug("---------- START refresh_token_request")
         url = self.apply_query_params(OAUTH_TOKEN_URL, OAUTH_REFRESH_TOKEN_QUERY_PARAMS)
         headers = self.apply_dict_params(OAUTH_TOKEN_HEADERS)
-        token_request = await self.make_http_request(url, 'POST', headers)
+        token_request = await self.make_http_request(url, 'POST', headers, endpoint="token")
         self.logger_filter.add_custom_value(token_request["access_token"])
         self.logger_filter.add_custom_value(token_request["refresh_token"])
         _LOGGER.debug(url)
@@ -563,54 +864,132 @@ class StellantisVehicles(StellantisOauth):
     async def get_user_vehicles(self):
         _LOGGER.debug("---------- START get_user_vehicles")
         if not self._vehicles:
-            url = self.apply_query_params(CAR_API_VEHICLES_URL, CLIENT_ID_QUERY_PARAMS)
-            headers = self.apply_dict_params(CAR_API_HEADERS)
-            vehicles_request = await self.make_http_request(url, 'GET', headers)
-            if "_embedded" in vehicles_request:
-                if "vehicles" in vehicles_request["_embedded"]:
-                    for vehicle in vehicles_request["_embedded"]["vehicles"]:
-                        self.logger_filter.add_custom_value(vehicle["vin"])
-                        self.logger_filter.add_custom_value(vehicle["id"])
-            _LOGGER.debug(url)
-            _LOGGER.debug(headers)
-            _LOGGER.debug(vehicles_request)
-            if "_embedded" in vehicles_request:
-                if "vehicles" in vehicles_request["_embedded"]:
-                    for vehicle in vehicles_request["_embedded"]["vehicles"]:
-                        vehicle_data = {
-                            "vehicle_id": vehicle["id"],
-                            "vin": vehicle["vin"],
-                            "type": vehicle["motorization"]
-                        }
-                        try:
-                            picture = await self.resize_and_save_picture(vehicle["pictures"][0], vehicle["vin"])
-                            vehicle_data["picture"] = picture
-                        except Exception as e:
-                            _LOGGER.warning(str(e))
-                        self._vehicles.append(vehicle_data)
-                else:
-                    _LOGGER.warning("No vehicles found in vehicles_request['_embedded']")
+            if self._catalog.vehicles:
+                # Known vehicles, async_revalidate_catalog checks them against the API in background
+                for vehicle in self._catalog.vehicles:
+                    self.logger_filter.add_custom_value(vehicle["vin"])
+                    self.logger_filter.add_custom_value(vehicle["vehicle_id"])
+                self._vehicles = [dict(vehicle) for vehicle in self._catalog.vehicles]
+                self._vehicles_from_catalog = True
             else:
-                _LOGGER.warning("No _embedded found in vehicles_request")
+                self._vehicles = await self.fetch_user_vehicles()
+                if self._vehicles:
+                    await self._catalog.async_save(self._vehicles)
         _LOGGER.debug("---------- END get_user_vehicles")
         return self._vehicles
 
-    async def get_vehicle_status(self, vehicle):
+    @property
+    def vehicles_from_catalog(self):
+        return self._vehicles_from_catalog
+
+    async def fetch_user_vehicles(self):
+        _LOGGER.debug("---------- START fetch_user_vehicles")
+        vehicles = []
+        url = self.apply_query_params(CAR_API_VEHICLES_URL, CLIENT_ID_QUERY_PARAMS)
+        headers = self.apply_dict_params(CAR_API_HEADERS)
+        vehicles_request = await self.make_http_request(url, 'GET', headers, endpoint="vehicles", cache_key="vehicles", cache_ttl=CATALOG_CACHE_TTL)
+        if "_embedded" in vehicles_request:
+            if "vehicles" in vehicles_request["_embedded"]:
+                for vehicle in vehicles_request["_embedded"]["vehicles"]:
+                    self.logger_filter.add_custom_value(vehicle["vin"])
+                    self.logger_filter.add_custom_value(vehicle["id"])
+        _LOGGER.debug(url)
+        _LOGGER.debug(headers)
+        _LOGGER.debug(vehicles_request)
+        if "_embedded" in vehicles_request:
+            if "vehicles" in vehicles_request["_embedded"]:
+                for vehicle in vehicles_request["_embedded"]["vehicles"]:
+                    vehicle_data = {
+                        "vehicle_id": vehicle["id"],
+                        "vin": vehicle["vin"],
+                        "type": vehicle["motorization"]
+                    }
+                    # Downloaded later by async_load_pictures, the setup doesn't wait for it
+                    if vehicle.get("pictures"):
+                        vehicle_data["picture_url"] = vehicle["pictures"][0]
+                    vehicles.append(vehicle_data)
+            else:
+                _LOGGER.warning("No vehicles found in vehicles_request['_embedded']")
+        else:
+            _LOGGER.warning("No _embedded found in vehicles_request")
+        _LOGGER.debug("---------- END fetch_user_vehicles")
+        return vehicles
+
+    async def async_revalidate_catalog(self):
+        """ Compare the stored vehicles with the API, reload the entry only when vehicles were added or removed. """
+        _LOGGER.debug("---------- START async_revalidate_catalog")
+        try:
+            vehicles = await self.fetch_user_vehicles()
+        except Exception as e:
+            _LOGGER.warning(f"Vehicles revalidation failed: {str(e)}")
+            _LOGGER.debug("---------- END async_revalidate_catalog")
+            return
+        # An empty answer is not trusted, the stored vehicles are kept
+        if not vehicles:
+            _LOGGER.debug("---------- END async_revalidate_catalog")
+            return
+        current = {vehicle["vin"]: vehicle for vehicle in self._vehicles}
+        if catalog_changed(self._vehicles, vehicles):
+            _LOGGER.info("Vehicles of the account changed, reloading the entry")
+            for vehicle in vehicles:
+                if vehicle["vin"] in current:
+                    vehicle.update({field: current[vehicle["vin"]][field] for field in PICTURE_FIELDS if field in current[vehicle["vin"]]})
+            await self._catalog.async_save(vehicles)
+            self.remove_stale_devices(vehicles)
+            self._hass.config_entries.async_schedule_reload(self._entry.entry_id)
+        else:
+            # Same devices, keep the new picture sources
+            changed = False
+            for vehicle in vehicles:
+                if vehicle.get("picture_url") != current[vehicle["vin"]].get("picture_url"):
+                    current[vehicle["vin"]]["picture_url"] = vehicle.get("picture_url")
+                    changed = True
+            if changed:
+                await self._catalog.async_save(self._vehicles)
+                await self.async_load_pictures()
+        _LOGGER.debug("---------- END async_revalidate_catalog")
+
+    def remove_stale_devices(self, vehicles):
+        """ Detach from the entry the devices of the vehicles no longer in the account. """
+        identifiers = {(DOMAIN, vehicle["vin"], vehicle["type"]) for vehicle in vehicles}
+        registry = device_registry.async_get(self._hass)
+        for device in device_registry.async_entries_for_config_entry(registry, self._entry.entry_id):
+            if not device.identifiers & identifiers:
+                _LOGGER.debug(f"Removing device: {device.name}")
+                registry.async_update_device(device.id, remove_config_entry_id=self._entry.entry_id)
+
+    async def get_vehicle_status(self, vehicle, priority=PRIORITY_STATUS):
+        # Concurrent refreshes of the same vehicle share one request
+        key = (vehicle["vin"], "status")
+        if self._status_requests.is_fresh(key):
+            # Result of a request already handed to the coordinator
+            self._status_changed[vehicle["vin"]] = False
+        return await self._status_requests.run(key, self.fetch_vehicle_status, vehicle, priority)
+
+    async def fetch_vehicle_status(self, vehicle, priority=PRIORITY_STATUS):
         _LOGGER.debug("---------- START get_vehicle_status")
         # Ensure that the MQTT client is connected
-        if self.remote_commands and (self._mqtt is None or self._mqtt.is_connected() is False):
+        if self.remote_commands and not self.mqtt_connecting and (self._mqtt is None or self._mqtt.is_connected() is False):
             _LOGGER.debug("MQTT client is not connected, try to connect it")
             await self.connect_mqtt()
         # Fetch the vehicle status using the API
         url = self.apply_query_params(CAR_API_GET_VEHICLE_STATUS_URL, CLIENT_ID_QUERY_PARAMS, vehicle)
         headers = self.apply_dict_params(CAR_API_HEADERS)
-        vehicle_status_request = await self.make_http_request(url, 'GET', headers)
+        cache_key = ("status", vehicle["vin"])
+        # Set by this request only, never left over by a previous one
+        self._status_changed.pop(vehicle["vin"], None)
+        vehicle_status_request = await self.make_http_request(url, 'GET', headers, endpoint="status", cache_key=cache_key, priority=priority, hedge=HEDGE_STATUS_REQUESTS and not self._budget.enabled)
+        self._status_changed[vehicle["vin"]] = self._http_cache.has_changed(cache_key)
         _LOGGER.debug(url)
         _LOGGER.debug(headers)
         _LOGGER.debug(vehicle_status_request)
         _LOGGER.debug("---------- END get_vehicle_status")
         return vehicle_status_request
 
+    def vehicle_status_changed(self, vehicle):
+        """ If the last get_vehicle_status returned a new status (fresh single flight hits are unchanged). """
+        return self._status_changed.get(vehicle["vin"], True)
+
     async def get_vehicle_last_trip(self, vehicle, page_token=False):
         _LOGGER.debug("---------- START get_vehicle_last_trip")
         url = self.apply_query_params(CAR_API_GET_VEHICLE_TRIPS_URL, CLIENT_ID_QUERY_PARAMS, vehicle)
@@ -620,7 +999,7 @@ class StellantisVehicles(StellantisOauth):
         url = url + "&timestamps=" + limit_date + "/&distance=0.1-"
         if page_token:
             url = url + "&pageToken=" + page_token
-        vehicle_trips_request = await self.make_http_request(url, 'GET', headers)
+        vehicle_trips_request = await self.make_http_request(url, 'GET', headers, endpoint="trips")
         _LOGGER.debug(url)
         _LOGGER.debug(headers)
         _LOGGER.debug(vehicle_trips_request)
@@ -628,7 +1007,7 @@ class StellantisVehicles(StellantisOauth):
             last_page_url = vehicle_trips_request["_links"]["last"]["href"]
             page_token = last_page_url.split("pageToken=")[1]
             _LOGGER.debug("---------- END get_vehicle_last_trip")
-            return await self.get_vehicle_last_trip(page_token)
+            return await self.get_vehicle_last_trip(vehicle, page_token)
         _LOGGER.debug("---------- END get_vehicle_last_trip")
         return vehicle_trips_request
 
@@ -687,13 +1066,13 @@ class StellantisVehicles(StellantisOauth):
         if refresh_token_almost_expired and not access_token_only:
             otp_code = await self.get_otp_code()
             try:
-                token_request = await self.make_http_request(url, 'POST', headers, None, {"grant_type": "password", "password": otp_code})
+                token_request = await self.make_http_request(url, 'POST', headers, None, {"grant_type": "password", "password": otp_code}, endpoint="mqtt_token")
             except ConfigEntryAuthFailed:
                 _LOGGER.warning("Attempt to refresh MQTT access_token/refresh_token failed. This is NOT an error as long as the following attempt to refresh only the access_token (using current refresh_token) succeeds.")
                 return await self.refresh_mqtt_token_request(True)
         else:
             json_data = self.apply_dict_params(MQTT_REFRESH_TOKEN_JSON_DATA)
-            token_request = await self.make_http_request(url, 'POST', headers, None, json_data)
+            token_request = await self.make_http_request(url, 'POST', headers, None, json_data, endpoint="mqtt_token")
         if "access_token" in token_request:
             self.logger_filter.add_custom_value(token_request["access_token"])
         if "refresh_token" in token_request:
@@ -714,12 +1093,35 @@ class StellantisVehicles(StellantisOauth):
         self.update_stored_config("mqtt", mqtt_config)
         _LOGGER.debug("---------- END refresh_mqtt_token_request")
 
+    @property
+    def mqtt_connecting(self):
+        """ A connection (or the setup one, token refresh included) is pending. """
+        return self._mqtt_connect_started is not None and time.monotonic() - self._mqtt_connect_started < MQTT_CONNECT_TIMEOUT
+
+    async def async_start_mqtt(self):
+        """ MQTT token refresh and connection, run in background at setup. """
+        if not self.remote_commands:
+            return
+        self._mqtt_connect_started = time.monotonic()
+        try:
+            await self.scheduled_mqtt_token_refresh()
+        except ConfigEntryAuthFailed as e:
+            # Not raised by the setup anymore (background task): start the reauth like a failed setup did
+            _LOGGER.warning(f"MQTT authentication failed: {str(e)}")
+            self._mqtt_connect_started = None
+            self._entry.async_start_reauth(self._hass)
+            return
+        if self.remote_commands and (self._mqtt is None or self._mqtt.is_connected() is False):
+            await self.connect_mqtt()
+
     async def connect_mqtt(self):
         _LOGGER.debug("---------- START connect_mqtt")
+        self._mqtt_connect_started = time.monotonic()
         if self._mqtt is None:
             self._mqtt = MqttClientMod(clean_session=True, protocol=mqtt.MQTTv311)
             # self._mqtt.enable_logger(logger=_LOGGER)
-            self._mqtt.tls_set_context(_SSL_CONTEXT)
+            if MQTT_TLS:
+                self._mqtt.tls_set_context(_SSL_CONTEXT)
             self._mqtt.on_connect = self._on_mqtt_connect
             self._mqtt.on_disconnect = self._on_mqtt_disconnect
             self._mqtt.on_message = self._on_mqtt_message
@@ -728,16 +1130,24 @@ class StellantisVehicles(StellantisOauth):
             self._mqtt.disconnect()
         self._mqtt.username_pw_set("IMA_OAUTH_ACCESS_TOKEN", self.get_config("mqtt")["access_token"])
         try:
-            self._mqtt.connect(MQTT_SERVER, MQTT_PORT, MQTT_KEEP_ALIVE_S)
+            # Blocking socket connect and TLS handshake, out of the event loop
+            await self._hass.async_add_executor_job(self._mqtt.connect, MQTT_SERVER, MQTT_PORT, MQTT_KEEP_ALIVE_S)
             self._mqtt.loop_start() # Under the hood, this will call loop_forever in a thread, which means that the thread will terminate if we call disconnect()
         except Exception as e:
+            self._mqtt_connect_started = None
             _LOGGER.warning(f"Error: {str(e)}")
         _LOGGER.debug("---------- END connect_mqtt")
         return self._mqtt.is_connected()
 
+    def update_coordinators_threadsafe(self):
+        """ Write the entities from a paho thread: the availability of the commands follows the MQTT connection. """
+        for coordinator in list(self._coordinator_dict.values()):
+            self._hass.loop.call_soon_threadsafe(coordinator.async_update_listeners)
+
     def _on_mqtt_connect(self, client, userdata, result_code, _):
         _LOGGER.debug("---------- START _on_mqtt_connect")
         _LOGGER.debug(f"Code: {result_code}")
+        self._mqtt_connect_started = None
         try:
             topics = [MQTT_RESP_TOPIC + self.get_config("customer_id") + "/#"]
             for vehicle in self._vehicles:
@@ -747,11 +1157,13 @@ class StellantisVehicles(StellantisOauth):
                 _LOGGER.debug(f"Topic: {topic}")
         except Exception as e:
             _LOGGER.warning(f"Error: {str(e)}")
+        self.update_coordinators_threadsafe()
         _LOGGER.debug("---------- END _on_mqtt_connect")
 
     def _on_mqtt_disconnect(self, client, userdata, result_code):
         _LOGGER.debug("---------- START _on_mqtt_disconnect")
         _LOGGER.debug(f"Code: {result_code} -> {mqtt.error_string(result_code)}")
+        self.update_coordinators_threadsafe()
         try:
             if result_code == 11: # MQTT_ERR_AUTH
                 self.do_async(self.scheduled_mqtt_token_refresh(force=True))
@@ -772,7 +1184,7 @@ class StellantisVehicles(StellantisOauth):
         _LOGGER.debug("---------- START _on_mqtt_message")
         try:
             _LOGGER.debug(f"Message: {msg.topic} {msg.payload} {msg.qos}")
-            data = json.loads(msg.payload)
+            data = json_loads(msg.payload)
             if msg.topic.startswith(MQTT_RESP_TOPIC):
                 if "vin" in data:
                     coordinator = self.async_get_coordinator_by_vin(data["vin"])
@@ -808,12 +1220,13 @@ class StellantisVehicles(StellantisOauth):
                         result_code = "failed"
                     if result_code in ["300", "500", "not_compatible", "failed"]:
                         self.do_async(self.hass_notify("command_error"))
-                    if result_code == "0":
-                        _LOGGER.debug(f"Fetch updates after code: {result_code}")
-                        self.do_async(coordinator.async_refresh(), 10)
-
                     if result_code != "901":  # Not store "Vehicle as sleep" event
                         self.do_async(coordinator.update_command_history(data["correlation_id"], result_code))
+
+                    if result_code == "0":
+                        _LOGGER.debug(f"Verify updates after code: {result_code}")
+                        # Runs on the event loop, the paho network thread is not blocked while polling
+                        self._hass.loop.call_soon_threadsafe(coordinator.async_verify_command, data["correlation_id"])
                 else:
                     _LOGGER.error("No result code")
 
@@ -837,7 +1250,7 @@ class StellantisVehicles(StellantisOauth):
             date = get_datetime()
             if action_id is None:
                 action_id = str(uuid4()).replace("-", "") + date.strftime("%Y%m%d%H%M%S%f")[:-3]
-            data = json.dumps({
+            data = json_dumps({
                 "access_token": self.get_config("mqtt")["access_token"],
                 "customer_id": customer_id,
                 "correlation_id": action_id,
@@ -871,7 +1284,7 @@ class StellantisVehicles(StellantisOauth):
         params["api_key"] = ABRP_API_KEY
         _LOGGER.debug(params)
         try:
-            abrp_request = await self.make_http_request(ABRP_URL, "POST", None, params)
+            abrp_request = await self.make_http_request(ABRP_URL, "POST", None, params, endpoint="abrp")
             _LOGGER.debug(abrp_request)
             if "status" not in abrp_request or abrp_request["status"] != "ok":
                 _LOGGER.warning(abrp_request)
@@ -47,7 +47,7 @@ class StellantisBatteryChargingStart(StellantisBaseTime):
         self._attr_native_value = value
         self._coordinator._sensors[self._sensor_key] = value
         await self._coordinator.send_charge_command(self.name, True)
-        await self._coordinator.async_refresh()
+        await self._coordinator.async_refresh_after_change()
 
     def coordinator_update(self):
         if self.value_was_updated():
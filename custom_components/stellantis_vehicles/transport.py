@@ -0,0 +1,141 @@
+import logging
+import asyncio
+import os
+from collections.abc import Mapping
+from urllib.parse import urlsplit
+
+from .codec import ( json_loads, json_dumps )
+from .const import (
+    HTTP_TRANSPORT_LIVE,
+    HTTP_TRANSPORT_RECORD,
+    HTTP_TRANSPORT_REPLAY,
+    HTTP_TRANSPORT_MODE,
+    HTTP_CASSETTE_PATH,
+    HTTP_REPLAY_LATENCY
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+RECORDED_RESPONSE_HEADERS = ["Content-Type", "ETag", "Last-Modified"]
+# Response fields registered as secrets before masking, the integration registers them only after the request
+RECORDED_SECRET_KEYS = ["access_token", "refresh_token", "id_token", "code", "vin", "customer", "vehicle", "car_association_id"]
+# Request fields never written to the cassette: credentials (login, OTP password) are not registered in the logger filter
+REDACTED_REQUEST_KEYS = ["password", "email", "code", "otp_code", "access_token", "refresh_token", "id_token", "authorization", "client_secret"]
+
+
+def redact_request(data):
+    """ Request headers / params / body with the credential values replaced, by key (case insensitive). """
+    if isinstance(data, Mapping):
+        return {key: "###" if str(key).lower() in REDACTED_REQUEST_KEYS else redact_request(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [redact_request(item) for item in data]
+    return data
+
+
+def collect_secrets(data, result=None):
+    """ Secret values of a decoded response body. """
+    if result is None:
+        result = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in RECORDED_SECRET_KEYS and isinstance(value, str) and len(value) >= 8:
+                result.append(value)
+            else:
+                collect_secrets(value, result)
+        if "vin" in data and isinstance(data.get("id"), str):
+            # Vehicle id is part of the status/trips urls
+            result.append(data["id"])
+    elif isinstance(data, list):
+        for item in data:
+            collect_secrets(item, result)
+    return result
+
+
+class HttpRecorder:
+    """ Append masked request/response pairs to a JSON lines cassette. """
+    def __init__(self, hass, path, logger_filter):
+        self._hass = hass
+        self.path = path
+        self._logger_filter = logger_filter
+
+    def _append(self, line):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def record(self, method, endpoint, url, request, status, headers, body, duration):
+        try:
+            for value in collect_secrets(json_loads(body)):
+                self._logger_filter.add_custom_value(value)
+        except ValueError:
+            pass
+        mask = self._logger_filter.mask
+        entry = {
+            "method": method,
+            "endpoint": endpoint,
+            "url": mask(url),
+            "request": mask(redact_request(request)),
+            "status": status,
+            "headers": {key: headers[key] for key in RECORDED_RESPONSE_HEADERS if key in headers},
+            "body": mask(body.decode("utf-8", errors="replace")),
+            "duration": round(duration, 4)
+        }
+        await self._hass.async_add_executor_job(self._append, json_dumps(entry))
+
+
+class HttpReplayer:
+    """ Serve recorded responses in recording order per (method, endpoint, path), looping when exhausted. """
+    def __init__(self, hass, path, latency=0):
+        self._hass = hass
+        self.path = path
+        self.latency = latency
+        self._entries = None
+        self._positions = {}
+
+    @staticmethod
+    def get_key(method, endpoint, url):
+        # Query strings carry client ids, dates and page tokens: only the path identifies the resource
+        return (method, endpoint, urlsplit(url).path)
+
+    def _load(self):
+        entries = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json_loads(line)
+                entries.setdefault(self.get_key(entry["method"], entry["endpoint"], entry["url"]), []).append(entry)
+        return entries
+
+    async def replay(self, method, endpoint, url):
+        if self._entries is None:
+            self._entries = await self._hass.async_add_executor_job(self._load)
+        key = self.get_key(method, endpoint, url)
+        entries = self._entries.get(key)
+        if not entries:
+            # Fallback on the endpoint only, masked ids may differ from the live ones
+            entries = next((items for (m, e, _), items in self._entries.items() if m == method and e == endpoint), None)
+        if not entries:
+            raise KeyError(f"No recorded response for {method} {endpoint}")
+        position = self._positions.get(key, 0)
+        self._positions[key] = position + 1
+        entry = entries[position % len(entries)]
+        delay = entry.get("duration", 0) if self.latency == "recorded" else float(self.latency)
+        if delay:
+            await asyncio.sleep(delay)
+        return entry["status"], entry.get("headers", {}), entry["body"].encode("utf-8")
+
+
+def create_transport(hass, logger_filter, mode=HTTP_TRANSPORT_MODE, path=HTTP_CASSETTE_PATH, latency=HTTP_REPLAY_LATENCY):
+    """ Recorder / replayer for the configured transport mode, None when live. """
+    if mode == HTTP_TRANSPORT_LIVE:
+        return None
+    if not path:
+        path = hass.config.path(".storage", "stellantis_vehicles", "http_cassette.jsonl")
+    _LOGGER.warning(f"HTTP transport in {mode} mode: {path}")
+    if mode == HTTP_TRANSPORT_RECORD:
+        return HttpRecorder(hass, path, logger_filter)
+    if mode == HTTP_TRANSPORT_REPLAY:
+        return HttpReplayer(hass, path, latency)
+    _LOGGER.error(f"Unknown HTTP transport mode: {mode}")
+    return None
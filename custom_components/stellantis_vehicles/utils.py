@@ -2,8 +2,9 @@ import logging
 import asyncio
 from datetime import UTC, datetime, timedelta
 from asyncio import Semaphore
-from functools import wraps
+from functools import ( wraps, lru_cache )
 import re
+import time
 from typing import Any, Dict
 
 from homeassistant.util import dt
@@ -57,6 +58,58 @@ def replace_string_placeholders(string, placeholders=None):
         string = string.replace("{" + placeholder + "}", str(value))
     return string
 
+_TEMPLATE_PLACEHOLDER = re.compile(r"\{#([^#{}]+)#\}")
+TEMPLATE_MISSING = object()
+
+class RequestTemplate:
+    """ Template string compiled once into literal and placeholder segments. """
+    def __init__(self, template):
+        self.template = template
+        parts = _TEMPLATE_PLACEHOLDER.split(template)
+        self._literals = parts[0::2]
+        self._names = parts[1::2]
+        # Top level config keys used by the template ("oauth|access_token" -> "oauth")
+        self.keys = frozenset(name.split("|", 1)[0] for name in self._names)
+
+    def render(self, resolve):
+        """ Render in a single pass, unresolved placeholders are kept as they are. """
+        if not self._names:
+            return self.template
+        result = [self._literals[0]]
+        for name, literal in zip(self._names, self._literals[1:]):
+            value = resolve(name)
+            result.append("{#" + name + "#}" if value is TEMPLATE_MISSING else str(value))
+            result.append(literal)
+        return "".join(result)
+
+@lru_cache(maxsize=256)
+def compile_template(template):
+    return RequestTemplate(template)
+
+def get_value_from_map(data, value_map):
+    """ Walk a value map (keys, list indexes, {field: value} list selectors) into the vehicle data. """
+    value = None
+    for key in value_map:
+        if value is None: # first key in the map
+            if key in data:
+                value = data[key]
+        else: # following keys in the map (value has been set with result of previous key)
+            if isinstance(key, dict):
+                if isinstance(value, list): # key is a dict and value a list
+                    # Use dictionnary in map as key_field, key_value to look for in value list
+                    key_field, key_value = next(iter(key.items()))
+                    # Select value in list with key_field matching to key_value
+                    value = next((item for item in value if item.get(key_field) == key_value), None)
+                else: # set value to None if key is dictionnary and value not a list
+                    value = None
+            elif isinstance(key, int) or key in value:
+                value = value[key]
+            else: # value not an array and key not found in value
+                value = None
+        if value is None: # Stop iteration immediately if None value encountered at this stage
+            break
+    return value
+
 def sort_dict(items, ordered_keys=None):
     if ordered_keys is None or not isinstance(ordered_keys, list):
         return items
@@ -88,6 +141,44 @@ def rate_limit(limit: int, every: int):
     
     return limit_decorator
 
+class SingleFlight:
+    """ Coalesce concurrent calls with the same key into one in-flight call. """
+    def __init__(self, ttl=0):
+        self._ttl = ttl
+        self._pending = {}
+        self._results = {}
+
+    def is_fresh(self, key):
+        """ If run returns the result of a completed call without calling. """
+        cached = self._results.get(key)
+        return cached is not None and (time.monotonic() - cached[0]) < self._ttl
+
+    async def run(self, key, func, *args, **kwargs):
+        if self.is_fresh(key):
+            _LOGGER.debug(f"Single flight {key}: return fresh result")
+            return self._results[key][1]
+
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._pending[key] = task
+
+            def on_done(done_task):
+                self._pending.pop(key, None)
+                if not done_task.cancelled() and done_task.exception() is None:
+                    self._results[key] = (time.monotonic(), done_task.result())
+
+            task.add_done_callback(on_done)
+        else:
+            _LOGGER.debug(f"Single flight {key}: wait in-flight call")
+
+        # Shield the shared call, a cancelled caller must not cancel the others
+        return await asyncio.shield(task)
+
+    def forget(self, key):
+        self._results.pop(key, None)
+
+
 class SensitiveDataFilter(logging.Filter):
     def __init__(self):
         super().__init__()
@@ -146,6 +237,10 @@ class SensitiveDataFilter(logging.Filter):
 
         return True
 
+    def mask(self, value: Any) -> Any:
+        """ Mask sensitive values in a string, dict or list, regardless of the anonymize option. """
+        return self._mask_value(value)
+
     def _mask_value(self, value: Any) -> Any:
         if value is None:
             return value
@@ -0,0 +1,76 @@
+import logging
+
+from .utils import get_value_from_map
+from .polling import get_upload_timestamp
+
+from .const import (
+    BINARY_SENSORS_DEFAULT,
+    COMMAND_VERIFY_FIRST_DELAY,
+    COMMAND_VERIFY_BACKOFF,
+    COMMAND_VERIFY_MAX_DELAY
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_CONFIRMED = "confirmed"
+COMMAND_UNCONFIRMED = "unconfirmed"
+
+
+class CommandExpectation:
+    """ Expected effect of a remote command on the vehicle status. """
+    def __init__(self, description, check):
+        self.description = description
+        self._check = check
+
+    def is_met(self, data, command):
+        try:
+            return bool(self._check(data, command))
+        except (KeyError, TypeError, ValueError):
+            return False
+
+
+def binary_value(data, key):
+    """ Raw value of a binary sensor (BINARY_SENSORS_DEFAULT value map). """
+    return get_value_from_map(data, BINARY_SENSORS_DEFAULT[key]["value_map"])
+
+
+def binary_is_on(data, key):
+    """ Binary sensor state like StellantisBaseBinarySensor computes it, None when the value is missing. """
+    value = binary_value(data, key)
+    if value is None:
+        return None
+    on_value = BINARY_SENSORS_DEFAULT[key]["on_value"]
+    if isinstance(value, list):
+        return on_value in value
+    return str(value).lower() == str(on_value).lower()
+
+
+def get_command_expectation(service, message):
+    """ Expectation of a command, None when its effect can't be seen in the vehicle status (horn, lights). """
+    if service == "/Doors":
+        unlocked = message.get("action") == "unlock"
+        return CommandExpectation(f"doors {'unlocked' if unlocked else 'locked'}", lambda data, command: binary_is_on(data, "doors") is unlocked)
+    if service == "/VehCharge":
+        charging = message.get("type") == "immediate"
+        return CommandExpectation(f"charging {'in progress' if charging else 'not in progress'}", lambda data, command: binary_is_on(data, "battery_charging") is charging)
+    if service == "/ThermalPrecond":
+        enabled = message.get("asap") == "activate"
+        return CommandExpectation(f"preconditioning {'enabled' if enabled else 'disabled'}", lambda data, command: binary_is_on(data, "preconditioning") is enabled)
+    if service == "/VehCharge/state":
+        # Wakeup: the vehicle uploads a new status
+        return CommandExpectation("new status upload", lambda data, command: (get_upload_timestamp(data) or 0) > (command.get("sent_upload") or 0))
+    return None
+
+
+def get_verify_delays(timeout):
+    """ Delays between the verification polls: exponential backoff, capped, until the timeout. """
+    delays = []
+    delay = COMMAND_VERIFY_FIRST_DELAY
+    elapsed = 0
+    while elapsed + delay <= timeout:
+        delays.append(delay)
+        elapsed += delay
+        delay = min(delay * COMMAND_VERIFY_BACKOFF, COMMAND_VERIFY_MAX_DELAY)
+    if elapsed < timeout:
+        delays.append(timeout - elapsed)
+    return delays
@@ -0,0 +1,85 @@
+"""Status change detection of StellantisVehicles across 200 / 304 / 404 40400 answers.
+
+The HTTP layer is replaced by scripted answers, the requests go through the
+scheduler, the response cache and the single flight like in production:
+
+    python -m pytest tests
+"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.stellantis_vehicles.stellantis import StellantisVehicles
+from custom_components.stellantis_vehicles.const import FIELD_REMOTE_COMMANDS
+
+VEHICLE = {"vehicle_id": "vehicle-00000", "vin": "VR3UHZKXZLT000000", "type": "Electric"}
+STATUS = json.dumps({"battery": {"voltage": 80}, "lastPosition": {"properties": {"updatedAt": "2026-10-17T10:00:00Z"}}}).encode()
+NOT_FOUND = json.dumps({"message": "We didn't find the status for this vehicle.", "code": 40400}).encode()
+
+
+class ScriptedStellantis(StellantisVehicles):
+    """ StellantisVehicles answering the status requests from a list of (status, headers, body). """
+    def __init__(self, answers):
+        super().__init__(None)
+        self.save_config({FIELD_REMOTE_COMMANDS: False, "client_id": "client", "locale": "fr-FR", "realm": "realm", "oauth": {"access_token": "token"}})
+        self.answers = list(answers)
+        self.sent_headers = []
+
+    async def fetch_http_response(self, url, method, headers, params, json_data, data, timeout, endpoint, max_size=None):
+        self.sent_headers.append(headers or {})
+        return self.answers.pop(0)
+
+    async def poll(self):
+        """ One coordinator poll: status then change flag, past the single flight freshness window. """
+        self._status_requests.forget((VEHICLE["vin"], "status"))
+        data = await self.get_vehicle_status(VEHICLE)
+        return data, self.vehicle_status_changed(VEHICLE)
+
+
+def test_status_changes_200_304_40400_200():
+    async def run():
+        stellantis = ScriptedStellantis([
+            (200, {"ETag": "\"a\""}, STATUS),
+            (304, {"ETag": "\"a\""}, b""),
+            (404, {}, NOT_FOUND),
+            (200, {"ETag": "\"a\""}, STATUS)
+        ])
+
+        data, changed = await stellantis.poll()
+        assert data["battery"]["voltage"] == 80
+        assert changed is True
+
+        data, changed = await stellantis.poll()
+        assert stellantis.sent_headers[-1].get("If-None-Match") == "\"a\""
+        assert data["battery"]["voltage"] == 80
+        assert changed is False
+
+        with pytest.raises(Exception):
+            await stellantis.poll()
+
+        # The cached status was dropped: no validators, and the same content is a change again
+        data, changed = await stellantis.poll()
+        assert "If-None-Match" not in stellantis.sent_headers[-1]
+        assert data["battery"]["voltage"] == 80
+        assert changed is True
+
+    asyncio.run(run())
+
+
+def test_status_fresh_single_flight_hit_is_unchanged():
+    async def run():
+        stellantis = ScriptedStellantis([(200, {"ETag": "\"a\""}, STATUS)])
+
+        data, changed = await stellantis.poll()
+        assert changed is True
+
+        # Within the freshness window: no request, the coordinator already saw this status
+        data = await stellantis.get_vehicle_status(VEHICLE)
+        assert data["battery"]["voltage"] == 80
+        assert stellantis.vehicle_status_changed(VEHICLE) is False
+        assert len(stellantis.sent_headers) == 1
+
+    asyncio.run(run())